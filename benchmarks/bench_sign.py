@@ -0,0 +1,56 @@
+"""Micro-benchmark of request signing throughput.
+
+Run from a checkout, the package does not need to be installed:
+
+    python benchmarks/bench_sign.py
+"""
+from __future__ import annotations
+
+import os
+import sys
+import timeit
+
+# The checkout's tuya_iot, not an installed one.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tuya_iot import TuyaOpenAPI  # noqa: E402
+
+NUMBER = 20000
+
+COMMANDS = {
+    "commands": [
+        {"code": "switch_led", "value": True},
+        {"code": "bright_value", "value": 25},
+        {"code": "colour_data", "value": {"h": 120, "s": 255, "v": 255}},
+    ]
+}
+PARAMS = {
+    "device_ids": ",".join(f"vdevo{i:010d}" for i in range(20)),
+    "page_size": 100,
+    "last_row_key": "",
+}
+
+
+def main():
+    """Print signing throughput in calls per second."""
+    api = TuyaOpenAPI("https://openapi.tuyaus.com", "access_id", "access_secret")
+
+    cases = {
+        "sign_get": lambda: api._calculate_sign("GET", "/v1.0/devices/", None),
+        "sign_get_params": lambda: api._calculate_sign(
+            "GET", "/v1.0/devices/", PARAMS
+        ),
+        "encode_and_sign_post": lambda: api._calculate_sign(
+            "POST",
+            "/v1.0/devices/vdevo1/commands",
+            None,
+            api._encode_body(COMMANDS),
+        ),
+    }
+    for (name, case) in cases.items():
+        seconds = min(timeit.repeat(case, number=NUMBER, repeat=5))
+        print(f"{name:24} {NUMBER / seconds:12.0f} ops/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,373 @@
+"""Benchmark suite of the SDK's hot paths, run against local stand-ins.
+
+Run from a checkout, the package does not need to be installed:
+
+    python benchmarks/bench_suite.py
+    python benchmarks/bench_suite.py --json results.json --fleet 5000
+
+Results are printed as a table; --json also writes them as a JSON document
+with one entry per measurement, to compare releases with each other.
+"""
+from __future__ import annotations
+
+import argparse
+import datetime
+import gc
+import json
+import os
+import platform
+import random
+import sys
+import time
+import timeit
+import tracemalloc
+from types import SimpleNamespace
+from typing import Any, Callable
+
+# The checkout's tuya_iot, not an installed one.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_sign import COMMANDS, PARAMS  # noqa: E402
+from tuya_iot import (  # noqa: E402
+    AuthType,
+    TuyaDevice,
+    TuyaDeviceListener,
+    TuyaDeviceManager,
+    TuyaHomeManager,
+    TuyaMQDispatcher,
+    TuyaOpenAPI,
+    TuyaOpenMQ,
+)
+from tuya_iot.fake_cloud import (  # noqa: E402
+    TuyaFakeCloud,
+    encrypt_mq_message,
+    make_fleet,
+)
+from tuya_iot.openmq import TuyaMQConfig  # noqa: E402
+from tuya_iot.version import VERSION  # noqa: E402
+
+MQ_PASSWORD = "fakepasswordfakepasswordfakepass"
+
+
+class NullListener(TuyaDeviceListener):
+    """Device listener doing nothing, to measure dispatch alone."""
+
+    def update_device(self, device: TuyaDevice):
+        """Ignore update."""
+
+    def add_device(self, device: TuyaDevice):
+        """Ignore add."""
+
+    def remove_device(self, device_id: str):
+        """Ignore remove."""
+
+
+def throughput(
+    name: str, func: Callable[[], Any], number: int, **params: Any
+) -> dict[str, Any]:
+    """Best of 5 runs of number calls, in calls per second."""
+    seconds = min(timeit.repeat(func, number=number, repeat=5))
+    return {
+        "name": name,
+        "metric": "throughput",
+        "value": number / seconds,
+        "unit": "ops/s",
+        "params": params,
+    }
+
+
+def duration(
+    name: str, func: Callable[[], Any], repeat: int, **params: Any
+) -> dict[str, Any]:
+    """Best of repeat runs of one call, in seconds."""
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return {
+        "name": name,
+        "metric": "duration",
+        "value": best,
+        "unit": "s",
+        "params": params,
+    }
+
+
+def device_map(fleet: list[dict[str, Any]]) -> dict[str, TuyaDevice]:
+    """Devices as update_device_list_in_smart_home caches them."""
+    devices = {}
+    for item in fleet:
+        device = TuyaDevice(**dict(item))
+        device.status = {status["code"]: status["value"] for status in item["status"]}
+        devices[item["id"]] = device
+    return devices
+
+
+def device_manager(
+    auth_type: AuthType, fleet: list[dict[str, Any]]
+) -> tuple[TuyaOpenMQ, TuyaDeviceManager]:
+    """Offline device manager with fleet in its device map."""
+    api = TuyaOpenAPI("http://127.0.0.1:1", "access_id", "access_secret", auth_type)
+    mq = TuyaOpenMQ(api)
+    manager = TuyaDeviceManager(api, mq)
+    manager.device_map = device_map(fleet)
+    manager.add_device_listener(NullListener())
+    return mq, manager
+
+
+def report_message(device_id: str, auth_type: AuthType) -> SimpleNamespace:
+    """Mqtt message carrying an encrypted device report."""
+    t = int(time.time() * 1000)
+    data = {
+        "dataId": "bench",
+        "devId": device_id,
+        "productKey": "bench",
+        "status": [{"code": "switch_1", "value": True, "t": t}],
+    }
+    payload = {
+        "protocol": 4,
+        "pv": "2.0",
+        "sign": "",
+        "t": t,
+        "data": encrypt_mq_message(data, MQ_PASSWORD, t, auth_type),
+    }
+    return SimpleNamespace(payload=json.dumps(payload).encode("utf8"))
+
+
+def bench_sign(number: int) -> list[dict[str, Any]]:
+    """Request signing."""
+    api = TuyaOpenAPI("https://openapi.tuyaus.com", "access_id", "access_secret")
+    body = api._encode_body(COMMANDS)
+    return [
+        throughput(
+            "calculate_sign",
+            lambda: api._calculate_sign("GET", "/v1.0/devices/", PARAMS),
+            number,
+            method="GET",
+        ),
+        throughput(
+            "calculate_sign",
+            lambda: api._calculate_sign(
+                "POST", "/v1.0/devices/vdevo1/commands", None, body
+            ),
+            number,
+            method="POST",
+        ),
+    ]
+
+
+def bench_decode(number: int) -> list[dict[str, Any]]:
+    """Mq message decryption and decoding, per auth type, one and in batches."""
+    results = []
+    mq_config = TuyaMQConfig({"result": {"password": MQ_PASSWORD}})
+    for auth_type in (AuthType.SMART_HOME, AuthType.CUSTOM):
+        (mq, _) = device_manager(auth_type, [])
+        payload = report_message("bench", auth_type).payload
+        message = json.loads(payload)
+        results.append(
+            throughput(
+                "decode_mq_message",
+                lambda: mq._decode_mq_message(
+                    message["data"], mq_config, message["t"]
+                ),
+                number,
+                auth_type=auth_type.name,
+            )
+        )
+
+        frames = [(payload, mq_config)] * 32
+        result = throughput(
+            "decode_frames",
+            lambda: mq._decode_frames(frames),
+            number // len(frames),
+            auth_type=auth_type.name,
+            batch=len(frames),
+        )
+        result["value"] *= len(frames)
+        results.append(result)
+    return results
+
+
+def bench_on_message(number: int, fleet_size: int) -> list[dict[str, Any]]:
+    """Mq message from payload bytes to device listeners.
+
+    Inline runs everything on the calling thread, queued goes through a
+    started dispatcher and includes the hand-off to its worker, sharded
+    through a dispatcher decoding on two workers and handling on four shards.
+    """
+    results = []
+    fleet = make_fleet(fleet_size)
+    for auth_type in (AuthType.SMART_HOME, AuthType.CUSTOM):
+        (mq, _) = device_manager(auth_type, fleet)
+        user_data = {"mqConfig": TuyaMQConfig({"result": {"password": MQ_PASSWORD}})}
+        messages = [
+            report_message(device["id"], auth_type) for device in fleet[:100]
+        ]
+        work = iter(messages * (number // len(messages) + 1) * 5)
+        results.append(
+            throughput(
+                "on_message",
+                lambda: mq._on_message(None, user_data, next(work)),
+                number,
+                auth_type=auth_type.name,
+                devices=fleet_size,
+                dispatch="inline",
+            )
+        )
+
+        work = messages * (number // len(messages) + 1)
+
+        def queued():
+            for message in work[:number]:
+                mq._on_message(None, user_data, message)
+            mq.dispatcher.join()
+
+        for (dispatch, dispatcher) in (
+            ("queued", mq.dispatcher),
+            ("sharded", TuyaMQDispatcher(workers=2, shards=4)),
+        ):
+            mq.dispatcher = dispatcher
+            dispatcher.start(mq._decode_frames, mq._notify)
+            result = duration(
+                "on_message", queued, 5, auth_type=auth_type.name, devices=fleet_size
+            )
+            dispatcher.stop()
+            result.update(
+                metric="throughput", value=number / result["value"], unit="ops/s"
+            )
+            result["params"]["dispatch"] = dispatch
+            results.append(result)
+    return results
+
+
+def bench_device_report(number: int, sizes: list[int]) -> list[dict[str, Any]]:
+    """Device report applied to the device map, per fleet size."""
+    results = []
+    for size in sizes:
+        fleet = make_fleet(size)
+        (_, manager) = device_manager(AuthType.SMART_HOME, fleet)
+        rand = random.Random(size)
+        ids = [rand.choice(fleet)["id"] for _ in range(1000)]
+        reports = [[{"code": "switch_1", "value": True, "t": 0}]] * len(ids)
+        work = iter(list(zip(ids, reports)) * (number // len(ids) + 1) * 5)
+
+        def report():
+            (device_id, status) = next(work)
+            manager._on_device_report(device_id, status)
+
+        results.append(throughput("on_device_report", report, number, devices=size))
+        gc.collect()
+    return results
+
+
+def bench_update_device_cache(fleet_size: int, repeat: int) -> list[dict[str, Any]]:
+    """Full home device cache update against a fake fleet, per auth type."""
+    results = []
+    with TuyaFakeCloud(make_fleet(fleet_size), asset_size=100) as cloud:
+        for auth_type in (AuthType.SMART_HOME, AuthType.CUSTOM):
+            api = TuyaOpenAPI(
+                cloud.endpoint, cloud.access_id, cloud.access_secret, auth_type
+            )
+            api.connect("bench", "bench", "1", "tuyaSmart")
+            mq = TuyaOpenMQ(api)
+            manager = TuyaDeviceManager(api, mq)
+            home = TuyaHomeManager(api, mq, manager)
+
+            requests_before = cloud.request_count
+            result = duration(
+                "update_device_cache",
+                home.update_device_cache,
+                repeat,
+                auth_type=auth_type.name,
+                devices=fleet_size,
+            )
+            result["params"]["requests"] = (
+                cloud.request_count - requests_before
+            ) // repeat
+            results.append(result)
+    return results
+
+
+def bench_device_memory(size: int) -> list[dict[str, Any]]:
+    """Retained memory per cached TuyaDevice, specifications shared."""
+    fleet = make_fleet(size)
+    (_, manager) = device_manager(AuthType.SMART_HOME, [])
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    manager.device_map = device_map(fleet)
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return [
+        {
+            "name": "device_memory",
+            "metric": "memory",
+            "value": (after - before) / size,
+            "unit": "bytes/device",
+            "params": {"devices": size},
+        }
+    ]
+
+
+def main():
+    """Run the suite and print or write the results."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--json", help="write results as json to this file, - stdout")
+    parser.add_argument("--number", type=int, default=10000, help="calls per run")
+    parser.add_argument("--fleet", type=int, default=1000, help="fake fleet size")
+    parser.add_argument(
+        "--sizes",
+        default="1000,10000,100000",
+        help="device map sizes of the device report benchmark",
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="full update runs")
+    parser.add_argument("--only", help="run benchmarks whose name contains this")
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",")]
+    benchmarks = {
+        "calculate_sign": lambda: bench_sign(args.number),
+        "decode_mq_message": lambda: bench_decode(args.number),
+        "on_message": lambda: bench_on_message(args.number, args.fleet),
+        "on_device_report": lambda: bench_device_report(args.number, sizes),
+        "update_device_cache": lambda: bench_update_device_cache(
+            args.fleet, args.repeat
+        ),
+        "device_memory": lambda: bench_device_memory(max(sizes)),
+    }
+
+    results = []
+    for (name, benchmark) in benchmarks.items():
+        if args.only and args.only not in name:
+            continue
+        for result in benchmark():
+            results.append(result)
+            params = ", ".join(f"{k}={v}" for (k, v) in result["params"].items())
+            print(
+                f"{result['name']:22} {result['value']:14.6g} {result['unit']:14} "
+                f"{params}",
+                file=sys.stderr if args.json == "-" else sys.stdout,
+            )
+
+    if args.json:
+        document = {
+            "version": VERSION,
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "platform": platform.platform(),
+            "codec": TuyaOpenAPI("", "", "").codec.name,
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "results": results,
+        }
+        if args.json == "-":
+            json.dump(document, sys.stdout, indent=2)
+        else:
+            with open(args.json, "w") as fileobj:
+                json.dump(document, fileobj, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -40,6 +40,11 @@ setup(
     ],
     version=__version__,
     install_requires=requirements(),
+    extras_require={
+        "async": ["aiohttp"],
+        "http2": ["httpx[http2]"],
+        "speedups": ["orjson"],
+    },
     test_suite="runtests.runtests",
     entry_points={"nose.plugins": []},
     packages=find_packages(),
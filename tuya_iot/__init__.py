@@ -1,21 +1,52 @@
 from .asset import TuyaAssetManager
-from .device import TuyaDevice, TuyaDeviceListener, TuyaDeviceManager
+from .cache import TuyaResponseCache
+from .coalescer import TuyaReportCoalescer
+from .codec import MsgspecCodec, OrjsonCodec, TuyaJSONCodec
+from .dispatcher import TuyaMQDispatcher
+from .device import (
+    TuyaDevice,
+    TuyaDeviceChange,
+    TuyaDeviceListener,
+    TuyaDeviceManager,
+)
 from .home import TuyaHomeManager, TuyaScene
 from .infrared import TuyaRemote
-from .openapi import TuyaOpenAPI, TuyaTokenInfo
+from .metrics import TuyaMetrics, TuyaRequestHook, prometheus_text
+from .openapi import TuyaOpenAPI, TuyaTokenInfo, TuyaTokenManager
+from .openapi_async import AsyncTuyaOpenAPI
 from .openlogging import TUYA_LOGGER
 from .openmq import TuyaOpenMQ
+from .scheduler import TuyaRequestScheduler
+from .store import TuyaDeviceStore
+from .transport import HTTP2Transport, RequestsTransport, TuyaTransport
 from .tuya_enums import AuthType, TuyaCloudOpenAPIEndpoint
 from .version import VERSION
 
 __all__ = [
     "TuyaOpenAPI",
+    "AsyncTuyaOpenAPI",
     "TuyaTokenInfo",
+    "TuyaTokenManager",
     "TuyaOpenMQ",
+    "TuyaMQDispatcher",
+    "TuyaRequestScheduler",
+    "TuyaResponseCache",
+    "TuyaTransport",
+    "RequestsTransport",
+    "HTTP2Transport",
+    "TuyaJSONCodec",
+    "OrjsonCodec",
+    "MsgspecCodec",
+    "TuyaRequestHook",
+    "TuyaMetrics",
+    "prometheus_text",
     "TuyaAssetManager",
     "TuyaDeviceManager",
     "TuyaDevice",
+    "TuyaDeviceChange",
     "TuyaDeviceListener",
+    "TuyaReportCoalescer",
+    "TuyaDeviceStore",
     "AuthType",
     "TuyaCloudOpenAPIEndpoint",
     "TuyaHomeManager",
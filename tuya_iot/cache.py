@@ -0,0 +1,128 @@
+"""Tuya open api response cache."""
+from __future__ import annotations
+
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+
+from .codec import TuyaJSONCodec, default_codec
+
+# (path pattern, ttl in seconds)
+DEFAULT_CACHE_RULES = [
+    (r"/functions(?:/[^/]+)?$", 60 * 60),
+    (r"/devices/[^/]+/specifications?$", 60 * 60),
+    (r"/devices/factory-infos$", 24 * 60 * 60),
+    (r"/iot-02/assets/[^/]+$", 5 * 60),
+]
+
+DEFAULT_CACHE_SIZE = 1024
+
+
+def request_key(path: str, params: Any = None) -> tuple:
+    """Hashable key of a request path and its params."""
+    if isinstance(params, dict):
+        return (path, tuple(sorted((k, str(v)) for (k, v) in params.items())))
+    return (path, repr(params))
+
+
+class TuyaResponseCache:
+    """Tuya response cache.
+
+    Caches successful GET responses whose path matches a rule, for the ttl
+    of the first matching rule. The least recently used entry is evicted
+    once max_size entries are cached. Hits return a fresh copy, so callers
+    may modify the response.
+
+    Typical usage example:
+
+    cache = TuyaResponseCache()
+    openapi = TuyaOpenAPI(ENDPOINT, ACCESS_ID, ACCESS_KEY, response_cache=cache)
+    cache.invalidate(r"/devices/vdevo123/")
+    """
+
+    def __init__(
+        self,
+        rules: list[tuple[str, float]] | None = None,
+        max_size: int = DEFAULT_CACHE_SIZE,
+        codec: TuyaJSONCodec | None = None,
+    ) -> None:
+        """Init TuyaResponseCache.
+
+        Args:
+            rules (list): (path pattern, ttl in seconds) tuples,
+                DEFAULT_CACHE_RULES if not given
+            max_size (int): max cached responses
+            codec (TuyaJSONCodec): codec of stored copies, the fastest
+                installed one if not given
+        """
+        self.rules = [
+            (re.compile(pattern), ttl)
+            for (pattern, ttl) in (DEFAULT_CACHE_RULES if rules is None else rules)
+        ]
+        self.max_size = max_size
+        self.codec = codec if codec is not None else default_codec()
+        self.hits = 0
+        self.misses = 0
+        self.__entries: OrderedDict[tuple, tuple[float, bytes]] = OrderedDict()
+        self.__lock = threading.Lock()
+
+    def _ttl(self, path: str) -> float | None:
+        for (pattern, ttl) in self.rules:
+            if pattern.search(path):
+                return ttl
+        return None
+
+    def is_cacheable(self, path: str) -> bool:
+        """Whether responses of path are cached."""
+        return self._ttl(path) is not None
+
+    def get(self, path: str, params: Any = None) -> dict[str, Any] | None:
+        """Get the cached response of path and params, None if missing."""
+        key = request_key(path, params)
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self.__entries[key]
+                self.misses += 1
+                return None
+            self.__entries.move_to_end(key)
+            self.hits += 1
+        return self.codec.loads(entry[1])
+
+    def set(self, path: str, params: Any, response: dict[str, Any]):
+        """Cache response if path matches a rule and the call succeeded."""
+        ttl = self._ttl(path)
+        if ttl is None or not response or not response.get("success", False):
+            return
+
+        key = request_key(path, params)
+        entry = (time.monotonic() + ttl, self.codec.dumps(response))
+        with self.__lock:
+            self.__entries[key] = entry
+            self.__entries.move_to_end(key)
+            while len(self.__entries) > self.max_size:
+                self.__entries.popitem(last=False)
+
+    def invalidate(self, pattern: str):
+        """Drop cached responses whose path matches the regex pattern."""
+        regex = re.compile(pattern)
+        with self.__lock:
+            for key in [key for key in self.__entries if regex.search(key[0])]:
+                del self.__entries[key]
+
+    def invalidate_path(self, path: str, params: Any = None):
+        """Drop the cached response of exactly path and params."""
+        with self.__lock:
+            self.__entries.pop(request_key(path, params), None)
+
+    def clear(self):
+        """Drop all cached responses."""
+        with self.__lock:
+            self.__entries.clear()
+
+    def __len__(self) -> int:
+        """Count cached responses."""
+        return len(self.__entries)
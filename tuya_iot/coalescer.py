@@ -0,0 +1,136 @@
+"""Tuya device report coalescing."""
+from __future__ import annotations
+
+import heapq
+import threading
+import time
+from typing import Any, Callable
+
+from .openlogging import logger
+
+
+class TuyaReportCoalescer:
+    """Device report coalescer.
+
+    Reports of a device with a window set are merged per DP code, the last
+    value wins, and flushed once when the window since its first buffered
+    report ends. Windows are set per device id or per category, the device
+    id wins. The window is not extended by later reports, so a device
+    reporting without pause is still flushed every window.
+
+    Flushes run on one timer thread, started with the first buffered report.
+
+    Typical usage example:
+
+    coalescer = TuyaReportCoalescer(flush)
+    coalescer.set_window(1.0, category="zndb")
+    """
+
+    def __init__(
+        self,
+        flush: Callable[[str, dict[str, Any]], None],
+        default_window: float = 0,
+        merge: Callable[[dict[str, Any], dict[str, Any]], None] | None = None,
+    ) -> None:
+        """Init TuyaReportCoalescer.
+
+        Args:
+            flush: called with the device id and its merged {code: value}
+            default_window (float): seconds for devices without a window of
+                their own, 0 to pass their reports through
+            merge: merges a report into the buffered one in place, dict.update
+                if not given
+        """
+        self.flush = flush
+        self.default_window = default_window
+        self.merge = merge if merge is not None else dict.update
+        self.device_windows: dict[str, float] = {}
+        self.category_windows: dict[str, float] = {}
+
+        self.__pending: dict[str, dict[str, Any]] = {}
+        self.__deadlines: list[tuple[float, str]] = []
+        self.__condition = threading.Condition()
+        self.__thread: threading.Thread | None = None
+
+    def set_window(
+        self,
+        seconds: float,
+        device_id: str | None = None,
+        category: str | None = None,
+    ):
+        """Set the window of a device or a category, 0 to disable it."""
+        if device_id is not None:
+            self.device_windows[device_id] = seconds
+        elif category is not None:
+            self.category_windows[category] = seconds
+        else:
+            self.default_window = seconds
+
+    def window(self, device_id: str, category: str | None = None) -> float:
+        """Window of a device in seconds."""
+        seconds = self.device_windows.get(device_id)
+        if seconds is None:
+            seconds = self.category_windows.get(category, self.default_window)
+        return seconds
+
+    def add(
+        self, device_id: str, category: str | None, status: dict[str, Any]
+    ) -> bool:
+        """Buffer a report.
+
+        Returns:
+            False if the device has no window, the caller delivers the report
+        """
+        seconds = self.window(device_id, category)
+        if seconds <= 0:
+            return False
+
+        with self.__condition:
+            pending = self.__pending.get(device_id)
+            if pending is not None:
+                self.merge(pending, status)
+                return True
+            self.__pending[device_id] = dict(status)
+            heapq.heappush(self.__deadlines, (time.monotonic() + seconds, device_id))
+            if self.__thread is None:
+                self.__thread = threading.Thread(
+                    target=self.__run, name="tuya-report-coalescer", daemon=True
+                )
+                self.__thread.start()
+            self.__condition.notify()
+        return True
+
+    def pending(self) -> int:
+        """Devices with buffered reports."""
+        with self.__condition:
+            return len(self.__pending)
+
+    def flush_all(self):
+        """Flush every buffered report now, on the calling thread."""
+        with self.__condition:
+            pending = self.__pending
+            self.__pending = {}
+            self.__deadlines = []
+        for (device_id, status) in pending.items():
+            self.__flush(device_id, status)
+
+    def __flush(self, device_id: str, status: dict[str, Any]):
+        try:
+            self.flush(device_id, status)
+        except Exception as e:
+            logger.exception(f"report flush failed: {e}")
+
+    def __run(self):
+        while True:
+            with self.__condition:
+                while True:
+                    now = time.monotonic()
+                    if self.__deadlines and self.__deadlines[0][0] <= now:
+                        (_, device_id) = heapq.heappop(self.__deadlines)
+                        status = self.__pending.pop(device_id, None)
+                        break
+                    self.__condition.wait(
+                        self.__deadlines[0][0] - now if self.__deadlines else None
+                    )
+            if status is not None:
+                self.__flush(device_id, status)
@@ -0,0 +1,91 @@
+"""Tuya json codec."""
+from __future__ import annotations
+
+import json
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:  # pragma: no cover
+    msgspec = None
+
+
+class TuyaJSONCodec:
+    """Json codec on the standard library.
+
+    Bodies are encoded once to compact utf8 bytes, which are both hashed for
+    the signature and sent as is. Subclass to plug in another json library.
+    """
+
+    name = "json"
+
+    def dumps(self, obj: Any) -> bytes:
+        """Encode obj to json bytes."""
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode(
+            "utf8"
+        )
+
+    def loads(self, data: bytes | str) -> Any:
+        """Decode json bytes or text."""
+        return json.loads(data)
+
+    def pretty(self, obj: Any) -> str:
+        """Encode obj to indented json text, for logs."""
+        return json.dumps(obj, ensure_ascii=False, indent=2)
+
+
+class OrjsonCodec(TuyaJSONCodec):
+    """Json codec on orjson."""
+
+    name = "orjson"
+
+    def dumps(self, obj: Any) -> bytes:
+        """Encode obj to json bytes."""
+        return orjson.dumps(obj)
+
+    def loads(self, data: bytes | str) -> Any:
+        """Decode json bytes or text."""
+        return orjson.loads(data)
+
+    def pretty(self, obj: Any) -> str:
+        """Encode obj to indented json text, for logs."""
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode("utf8")
+
+
+class MsgspecCodec(TuyaJSONCodec):
+    """Json codec on msgspec."""
+
+    name = "msgspec"
+
+    def __init__(self) -> None:
+        """Init MsgspecCodec."""
+        self.__encoder = msgspec.json.Encoder()
+        self.__decoder = msgspec.json.Decoder()
+
+    def dumps(self, obj: Any) -> bytes:
+        """Encode obj to json bytes."""
+        return self.__encoder.encode(obj)
+
+    def loads(self, data: bytes | str) -> Any:
+        """Decode json bytes or text."""
+        return self.__decoder.decode(data)
+
+    def pretty(self, obj: Any) -> str:
+        """Encode obj to indented json text, for logs."""
+        return msgspec.json.format(self.__encoder.encode(obj), indent=2).decode(
+            "utf8"
+        )
+
+
+def default_codec() -> TuyaJSONCodec:
+    """Fastest available codec: orjson, then msgspec, then the stdlib."""
+    if orjson is not None:
+        return OrjsonCodec()
+    if msgspec is not None:
+        return MsgspecCodec()
+    return TuyaJSONCodec()
@@ -1,14 +1,20 @@
 """Tuya device api."""
 from __future__ import annotations
 
+import threading
 import time
 from abc import ABCMeta, abstractclassmethod
+from concurrent.futures import ThreadPoolExecutor
 from types import SimpleNamespace
-from typing import Any, Literal, Optional
+from typing import Any, Callable, Iterable, Literal, Optional
 
+from .coalescer import TuyaReportCoalescer
 from .openapi import TuyaOpenAPI
 from .openlogging import logger
 from .openmq import TuyaOpenMQ
+from .scheduler import TuyaTokenBucket
+from .store import TuyaDeviceStore
+from .subscriptions import TuyaSubscriptions
 from .tuya_enums import AuthType
 
 PROTOCOL_DEVICE_REPORT = 4
@@ -21,6 +27,12 @@ BIZCODE_DPNAME_UPDATE = "dpNameUpdate"
 BIZCODE_BIND_USER = "bindUser"
 BIZCODE_DELETE = "delete"
 
+DEVICE_LIST_BATCH_SIZE = 20
+DEVICE_LIST_BATCH_WORKERS = 4
+
+# Status calls per second when resyncing devices after an mq gap.
+RESYNC_BATCHES_PER_SECOND = 5
+
 
 class TuyaDeviceFunction(SimpleNamespace):
     """Tuya device's function.
@@ -54,6 +66,66 @@ class TuyaDeviceStatusRange(SimpleNamespace):
     values: str
 
 
+class TuyaDeviceChange(SimpleNamespace):
+    """Tuya device's change.
+
+    Attributes:
+        device_id(str): changed device's id
+        status(dict): changed DP codes, code -> (previous value, new value),
+            previous is None for codes the device did not have
+        attributes(dict): changed attributes such as online and name,
+            name -> (previous value, new value)
+    """
+
+    device_id: str
+    status: dict[str, tuple[Any, Any]]
+    attributes: dict[str, tuple[Any, Any]]
+
+
+# Device fields not reported as attribute changes, update_time moves with
+# the status.
+_NOT_ATTRIBUTES = frozenset(
+    ("status", "status_time", "function", "status_range", "update_time")
+)
+
+
+def _merge_status_changes(
+    pending: dict[str, tuple[Any, Any]], changes: dict[str, tuple[Any, Any]]
+):
+    """Merge coalesced status changes, first previous and last new value win."""
+    for (code, (previous, value)) in changes.items():
+        if code in pending:
+            pending[code] = (pending[code][0], value)
+        else:
+            pending[code] = (previous, value)
+
+
+def _status_time(device: TuyaDevice) -> dict[str, int]:
+    """The device's own status_time, the class default is shared."""
+    times = vars(device).get("status_time")
+    if times is None:
+        times = device.status_time = {}
+    return times
+
+
+def _changed(name: str, previous: Any, value: Any) -> dict[str, tuple[Any, Any]]:
+    return {name: (previous, value)} if previous != value else {}
+
+
+def _attribute_changes(
+    previous: TuyaDevice | None, device: TuyaDevice
+) -> dict[str, tuple[Any, Any]]:
+    """Attributes of a refreshed device that differ from the cached one."""
+    if previous is None:
+        return {}
+    changes = {}
+    for (name, value) in vars(device).items():
+        if name in _NOT_ATTRIBUTES:
+            continue
+        changes.update(_changed(name, getattr(previous, name, None), value))
+    return changes
+
+
 class TuyaDevice(SimpleNamespace):
     """Tuya Device.
 
@@ -78,6 +150,7 @@ class TuyaDevice(SimpleNamespace):
           update_time: The update time of device status
 
           status: Status set of the device
+          status_time: Timestamp in ms of each status code's value
           function: Instruction set of the device
           status_range: Status value range set of the device
     """
@@ -100,6 +173,7 @@ class TuyaDevice(SimpleNamespace):
     update_time: int
 
     status: dict[str, Any] = {}
+    status_time: dict[str, int] = {}
     function: dict[str, TuyaDeviceFunction] = {}
     status_range: dict[str, TuyaDeviceStatusRange] = {}
 
@@ -138,6 +212,19 @@ class TuyaDeviceListener(metaclass=ABCMeta):
         """
         pass
 
+    def change_device(self, device: TuyaDevice, change: TuyaDeviceChange):
+        """Device changed, called instead of update_device.
+
+        Override to get what changed without diffing the device. By default
+        it calls update_device, so listeners not overriding it are unchanged.
+        change.status may be empty when a report repeats current values.
+
+        Args:
+            device(TuyaDevice): updated device info
+            change(TuyaDeviceChange): changed DP codes and attributes
+        """
+        self.update_device(device)
+
 
 class TuyaDeviceManager:
     """Tuya Device Manager.
@@ -147,25 +234,69 @@ class TuyaDeviceManager:
 
     """
 
-    def __init__(self, api: TuyaOpenAPI, mq: TuyaOpenMQ) -> None:
-        """Tuya device manager init."""
+    def __init__(
+        self, api: TuyaOpenAPI, mq: TuyaOpenMQ, store: TuyaDeviceStore | None = None
+    ) -> None:
+        """Tuya device manager init.
+
+        Args:
+            store (TuyaDeviceStore): optional persistent store, the device map
+                and specifications are loaded from it on init, without network
+                calls; TuyaHomeManager's update_device_cache reconciles them
+                with the cloud
+        """
         self.api = api
         self.mq = mq
+        self.store = store
         if api.auth_type == AuthType.SMART_HOME:
             self.device_manage = SmartHomeDeviceManage(api)
         else:
             self.device_manage = IndustrySolutionDeviceManage(api)
 
         mq.add_message_listener(self.on_message)
+        mq.add_reconnect_listener(self._on_mq_reconnect)
         self.device_map: dict[str, TuyaDevice] = {}
         self.device_listeners = set()
+        # Listeners added with filters, looked up by the device's values.
+        self.device_subscriptions = TuyaSubscriptions()
+
+        # Status writes dropped as older than the value they would replace.
+        self.stale_writes = 0
+        self.__status_lock = threading.Lock()
+
+        # device id -> time.time() its status was last reported or polled.
+        self.device_updated_at: dict[str, float] = {}
+        # Ids loaded from the store past its device TTL, until polled again.
+        self.stale_device_ids: set[str] = set()
+        # Status calls of resyncs are paced, so a network blip does not
+        # turn into a burst against the cloud.
+        self.resync_bucket = TuyaTokenBucket(RESYNC_BATCHES_PER_SECOND)
+        self.__resync_lock = threading.Lock()
+
+        # Off by default, set windows on it to merge frequent reports.
+        self.coalescer = TuyaReportCoalescer(
+            self.__flush_report, merge=_merge_status_changes
+        )
+
+        # Batch device apis accept at most batch_size ids per call, larger
+        # lists are split and sent batch_workers at a time.
+        self.batch_size = DEVICE_LIST_BATCH_SIZE
+        self.batch_workers = DEVICE_LIST_BATCH_WORKERS
+
+        # (product_id, category) -> (function, status_range), shared by
+        # every device of the product.
+        self.specification_cache: dict[tuple[str, str], tuple[dict, dict]] = {}
+
+        if store is not None:
+            self.__load_store()
 
     def __del__(self):
         """Remove mqtt listener after object del."""
         self.mq.remove_message_listener(self.on_message)
+        self.mq.remove_reconnect_listener(self._on_mq_reconnect)
 
     def on_message(self, msg: str):
-        logger.debug(f"mq receive-> {msg}")
+        logger.debug("mq receive-> %s", msg)
         protocol = msg.get("protocol", 0)
         data = msg.get("data", {})
         if protocol == PROTOCOL_DEVICE_REPORT:
@@ -173,25 +304,97 @@ class TuyaDeviceManager:
         elif protocol == PROTOCOL_OTHER:
             self._on_device_other(data["devId"], data["bizCode"], data)
 
-    def __update_device(self, device: TuyaDevice):
-        for listener in self.device_listeners:
-            listener.update_device(device)
+    def __listeners(
+        self, device: TuyaDevice, codes: Iterable[str] | None = None
+    ) -> list[TuyaDeviceListener]:
+        # Without codes it is not a status change, code filters do not apply.
+        listeners = list(self.device_listeners)
+        if self.device_subscriptions:
+            for listener in self.device_subscriptions.match(
+                ignore=("code",) if codes is None else (),
+                device_id=device.id,
+                category=getattr(device, "category", None),
+                code=codes,
+            ):
+                if listener not in self.device_listeners:
+                    listeners.append(listener)
+        return listeners
+
+    def __update_device(
+        self,
+        device: TuyaDevice,
+        status: dict[str, tuple[Any, Any]] | None = None,
+        attributes: dict[str, tuple[Any, Any]] | None = None,
+    ):
+        # Computed once here, listeners do not diff the device themselves.
+        change = TuyaDeviceChange(
+            device_id=device.id,
+            status={
+                code: (previous, value)
+                for (code, (previous, value)) in (status or {}).items()
+                if previous != value
+            },
+            attributes=attributes or {},
+        )
+        for listener in self.__listeners(device, status):
+            listener.change_device(device, change)
 
     def _on_device_report(self, device_id: str, status: list):
         device = self.device_map.get(device_id, None)
         if not device:
             return
-        logger.debug(f"mq _on_device_report-> {status}")
-        for item in status:
-            if "code" in item and "value" in item:
-                code = item["code"]
-                value = item["value"]
+        logger.debug("mq _on_device_report-> %s", status)
+        reported = self.__merge_status(
+            device,
+            [
+                (item["code"], item["value"], item.get("t"))
+                for item in status
+                if "code" in item and "value" in item
+            ],
+        )
+        if not reported and status:
+            # Every value was older than the device's, nothing to tell.
+            return
+        self.device_updated_at[device_id] = time.time()
+
+        # Status is always current, only listener callbacks are coalesced.
+        if self.coalescer.add(device_id, getattr(device, "category", None), reported):
+            return
+        self.__update_device(device, reported)
+
+    def __merge_status(
+        self, device: TuyaDevice, values: list[tuple[str, Any, int | None]]
+    ) -> dict[str, tuple[Any, Any]]:
+        """Write (code, value, t) values unless older than the device's.
+
+        Reports and polls may be handled out of order, so a value is only
+        written if its timestamp is not older than that of the current one.
+        Values without a timestamp are always written.
+
+        Returns:
+            code -> (previous value, new value) of the written values
+        """
+        written = {}
+        with self.__status_lock:
+            times = _status_time(device)
+            for (code, value, t) in values:
+                last = times.get(code)
+                if t is not None and last is not None and t < last:
+                    self.stale_writes += 1
+                    continue
+                written[code] = (device.status.get(code), value)
                 device.status[code] = value
+                if t is not None:
+                    times[code] = t
+        return written
 
-        self.__update_device(device)
+    def __flush_report(self, device_id: str, status: dict[str, Any]):
+        device = self.device_map.get(device_id)
+        if device is not None:
+            self.__update_device(device, status)
 
     def _on_device_other(self, device_id: str, biz_code: str, data: dict[str, Any]):
-        logger.debug(f"mq _on_device_other-> {device_id} -- {biz_code}")
+        logger.debug("mq _on_device_other-> %s -- %s", device_id, biz_code)
 
         # bind device to user
         if biz_code == BIZCODE_BIND_USER:
@@ -207,7 +410,7 @@ class TuyaDeviceManager:
 
             if device_id in self.device_map.keys():
                 device = self.device_map.get(device_id)
-                for listener in self.device_listeners:
+                for listener in self.__listeners(device):
                     listener.add_device(device)
 
         # device status update
@@ -215,41 +418,64 @@ class TuyaDeviceManager:
         if not device:
             return
 
-        if biz_code == BIZCODE_ONLINE:
-            device.online = True
-            self.__update_device(device)
-        elif biz_code == BIZCODE_OFFLINE:
-            device.online = False
-            self.__update_device(device)
+        if biz_code in (BIZCODE_ONLINE, BIZCODE_OFFLINE):
+            previous = getattr(device, "online", None)
+            device.online = biz_code == BIZCODE_ONLINE
+            self.__update_device(
+                device, attributes=_changed("online", previous, device.online)
+            )
         elif biz_code == BIZCODE_NAME_UPDATE:
+            previous = getattr(device, "name", None)
             device.name = data["bizData"]["name"]
-            self.__update_device(device)
+            self.__update_device(
+                device, attributes=_changed("name", previous, device.name)
+            )
         elif biz_code == BIZCODE_DPNAME_UPDATE:
             pass
         elif biz_code == BIZCODE_DELETE:
-            del self.device_map[device_id]
-            for listener in self.device_listeners:
+            self._remove_device_caches([device_id])
+            for listener in self.__listeners(device):
                 listener.remove_device(device.id)
 
     ##############################
     # Memory Cache
 
-    def update_device_list_in_smart_home(self):
-        """Update devices status in project type SmartHome."""
+    def update_device_list_in_smart_home(self) -> list[str] | None:
+        """Update devices status in project type SmartHome.
+
+        Returns:
+            ids of the user's devices, None if the device list failed
+        """
+        device_ids = None
         response = self.api.get(f"/v1.0/users/{self.api.token_info.uid}/devices")
         if response["success"]:
+            updated_at = time.time()
+            device_ids = [item["id"] for item in response["result"]]
+            t = response.get("t")
             for item in response["result"]:
                 device = TuyaDevice(**item)
-                status = {}
-                for item_status in device.status:
-                    if "code" in item_status and "value" in item_status:
-                        code = item_status["code"]
-                        value = item_status["value"]
-                        status[code] = value
-                device.status = status
+                # The cached dicts are kept, so its newer values and reports
+                # landing on it before the swap below are not lost.
+                previous = self.device_map.get(item["id"])
+                device.status = previous.status if previous else {}
+                device.status_time = _status_time(previous) if previous else {}
+                self.__merge_status(
+                    device,
+                    [
+                        (item_status["code"], item_status["value"], t)
+                        for item_status in item.get("status", [])
+                        if "code" in item_status and "value" in item_status
+                    ],
+                )
                 self.device_map[item["id"]] = device
+                self.device_updated_at[item["id"]] = updated_at
+                self.stale_device_ids.discard(item["id"])
+                attributes = _attribute_changes(previous, device)
+                if attributes:
+                    self.__update_device(device, attributes=attributes)
 
         self.update_device_function_cache()
+        return device_ids
 
     def update_device_caches(self, devIds: list[str]):
         """Update devices status in cache.
@@ -257,7 +483,7 @@ class TuyaDeviceManager:
         Update devices info, devices status
 
         Args:
-          devIds(list[str]): devices' id, max 20 once call
+          devIds(list[str]): devices' id, split into batches of batch_size
         """
         self._update_device_list_info_cache(devIds)
         self._update_device_list_status_cache(devIds)
@@ -270,52 +496,277 @@ class TuyaDeviceManager:
         result = response.get("result", {})
         for item in result.get("list", []):
             device_id = item["id"]
-            self.device_map[device_id] = TuyaDevice(**item)
+            device = TuyaDevice(**item)
+            previous = self.device_map.get(device_id)
+            if "status" not in item:
+                # Own dicts, the class defaults are shared by every device.
+                device.status = previous.status if previous is not None else {}
+                device.status_time = (
+                    _status_time(previous) if previous is not None else {}
+                )
+            self.device_map[device_id] = device
+            attributes = _attribute_changes(previous, device)
+            if attributes:
+                self.__update_device(device, attributes=attributes)
 
     def _update_device_list_status_cache(self, devIds: list[str]):
 
-        response = self.get_device_list_status(devIds)
-        for item in response.get("result", []):
+        # Each batch with its own t, not the t of the whole poll.
+        for response in self.__batch_responses(
+            self.device_manage.get_device_list_status, devIds
+        ):
+            response = response or {}
+            self.__apply_device_list_status(
+                response.get("result", []), response.get("t")
+            )
+
+    def __apply_device_list_status(
+        self, result: list, t: int | None = None
+    ) -> list[tuple[TuyaDevice, dict[str, tuple[Any, Any]]]]:
+        """Apply statuses polled at t, return the changed devices and codes."""
+        updated_at = time.time()
+        changed = []
+        for item in result:
             device_id = item["id"]
-            for status in item["status"]:
-                if "code" in status and "value" in status:
-                    code = status["code"]
-                    value = status["value"]
-                    device = self.device_map[device_id]
-                    device.status[code] = value
+            device = self.device_map.get(device_id)
+            if device is None:
+                continue
+            written = self.__merge_status(
+                device,
+                [
+                    (status["code"], status["value"], t)
+                    for status in item["status"]
+                    if "code" in status and "value" in status
+                ],
+            )
+            changes = {
+                code: (previous, value)
+                for (code, (previous, value)) in written.items()
+                if previous != value
+            }
+            self.device_updated_at[device_id] = updated_at
+            self.stale_device_ids.discard(device_id)
+            if changes:
+                changed.append((device, changes))
+        return changed
+
+    def _on_mq_reconnect(self, gap_start: float, gap_end: float):
+        """Resync the devices not updated since the mq link went down."""
+        stale = [
+            device_id
+            for device_id in list(self.device_map)
+            if self.device_updated_at.get(device_id, 0) < gap_start
+        ]
+        logger.debug(
+            f"mq gap of {gap_end - gap_start:.1f}s, resyncing {len(stale)} devices"
+        )
+        self.resync_devices(stale)
+
+    def resync_devices(self, devIds: list[str]):
+        """Refresh the status of devices and notify listeners of changes.
+
+        Ids are fetched batch_size at a time, one batch after the other at
+        the pace of resync_bucket. Overlapping resyncs run one at a time.
+
+        Args:
+          devIds(list[str]): devices' id
+        """
+        with self.__resync_lock:
+            for i in range(0, len(devIds), self.batch_size):
+                wait = self.resync_bucket.reserve()
+                if wait > 0:
+                    time.sleep(wait)
+                response = self.device_manage.get_device_list_status(
+                    devIds[i : i + self.batch_size]
+                )
+                if not response.get("success", False):
+                    logger.error(f"device resync failed: {response.get('msg')}")
+                    continue
+                for (device, changes) in self.__apply_device_list_status(
+                    response.get("result", []), response.get("t")
+                ):
+                    self.__update_device(device, changes)
 
     def update_device_function_cache(self, devIds: list = []):
-        """Update device function cache."""
+        """Update device function cache.
+
+        Devices of the same product share one specification, it is fetched
+        once per (product_id, category) and reused from specification_cache.
+        """
         device_map = (
             filter(lambda d: d.id in devIds, self.device_map.values())
             if devIds
             else self.device_map.values()
         )
 
+        # Group devices by product, one representative is fetched per group.
+        product_devices: dict[Any, list[TuyaDevice]] = {}
         for device in device_map:
-            response = self.get_device_specification(device.id)
-            if response.get("success"):
-                result = response.get("result", {})
-                function_map = {}
-                for function in result["functions"]:
-                    code = function["code"]
-                    function_map[code] = TuyaDeviceFunction(**function)
-
-                status_range = {}
-                for status in result["status"]:
-                    code = status["code"]
-                    status_range[code] = TuyaDeviceStatusRange(**status)
-
+            product_key = self.__product_key(device)
+            if product_key is None:
+                # Unknown product, fetch its own specification.
+                product_key = device.id
+            product_devices.setdefault(product_key, []).append(device)
+
+        missing = [
+            devices[0].id
+            for (product_key, devices) in product_devices.items()
+            if product_key not in self.specification_cache
+        ]
+        if missing:
+            with ThreadPoolExecutor(
+                max_workers=min(self.batch_workers, len(missing))
+            ) as executor:
+                specifications = dict(
+                    zip(missing, executor.map(self.__fetch_specification, missing))
+                )
+        else:
+            specifications = {}
+
+        for (product_key, devices) in product_devices.items():
+            specification = self.specification_cache.get(product_key)
+            if specification is None:
+                specification = specifications.get(devices[0].id)
+                if specification is None:
+                    continue
+                if product_key != devices[0].id:
+                    self.specification_cache[product_key] = specification
+
+            (function_map, status_range) = specification
+            for device in devices:
                 device.function = function_map
                 device.status_range = status_range
 
-    def add_device_listener(self, listener: TuyaDeviceListener):
-        """Add device listener."""
-        self.device_listeners.add(listener)
+        if self.store is not None:
+            self.__save_store(product_devices, specifications)
+
+    @staticmethod
+    def __product_key(device: TuyaDevice) -> tuple[str, str] | None:
+        product_id = getattr(device, "product_id", None)
+        if not product_id:
+            return None
+        return (product_id, getattr(device, "category", ""))
+
+    def __fetch_specification(self, device_id: str) -> tuple[dict, dict] | None:
+        response = self.get_device_specification(device_id)
+        if not response or not response.get("success"):
+            return None
+
+        return self.__parse_specification(response.get("result", {}))
+
+    @staticmethod
+    def __parse_specification(result: dict[str, Any]) -> tuple[dict, dict]:
+        function_map = {}
+        for function in result["functions"]:
+            code = function["code"]
+            function_map[code] = TuyaDeviceFunction(**function)
+
+        status_range = {}
+        for status in result["status"]:
+            code = status["code"]
+            status_range[code] = TuyaDeviceStatusRange(**status)
+
+        return function_map, status_range
+
+    def __load_store(self):
+        specifications = {}
+        stored_specifications = self.store.load_specifications()
+        for (product_key, (result, fresh)) in stored_specifications.items():
+            specification = self.__parse_specification(result)
+            specifications[product_key] = specification
+            # Stale ones are used for the device map but fetched again.
+            if fresh:
+                self.specification_cache[product_key] = specification
+
+        for (device_id, (attributes, fresh)) in self.store.load_devices().items():
+            device = TuyaDevice(**attributes)
+            specification = specifications.get(self.__product_key(device))
+            if specification is not None:
+                (device.function, device.status_range) = specification
+            self.device_map[device_id] = device
+            if not fresh:
+                self.stale_device_ids.add(device_id)
+
+        logger.debug(
+            f"loaded {len(self.device_map)} devices from store, "
+            f"{len(self.stale_device_ids)} stale"
+        )
+
+    def __save_store(
+        self,
+        product_devices: dict[Any, list[TuyaDevice]],
+        specifications: dict[str, tuple[dict, dict] | None],
+    ):
+        fetched = {}
+        devices = {}
+        for (product_key, product_device_list) in product_devices.items():
+            specification = specifications.get(product_device_list[0].id)
+            if specification is not None and isinstance(product_key, tuple):
+                (function_map, status_range) = specification
+                fetched[product_key] = {
+                    "functions": [vars(item) for item in function_map.values()],
+                    "status": [vars(item) for item in status_range.values()],
+                }
+            for device in product_device_list:
+                devices[device.id] = {
+                    key: value
+                    for (key, value) in vars(device).items()
+                    if key not in ("function", "status_range")
+                }
+
+        try:
+            if fetched:
+                self.store.save_specifications(fetched)
+            self.store.save_devices(devices)
+        except Exception as e:
+            logger.exception(e)
+
+    def _remove_device_caches(self, device_ids: list[str]):
+        for device_id in device_ids:
+            self.device_map.pop(device_id, None)
+            self.device_updated_at.pop(device_id, None)
+            self.stale_device_ids.discard(device_id)
+        if self.store is not None:
+            self.store.remove_devices(device_ids)
+
+    def add_device_listener(
+        self,
+        listener: TuyaDeviceListener,
+        device_id: str | Iterable[str] | None = None,
+        category: str | Iterable[str] | None = None,
+        code: str | Iterable[str] | None = None,
+    ):
+        """Add device listener.
+
+        Without filters the listener gets every device. With filters it only
+        gets the devices matching all of them, and is found through an index
+        instead of being called for every device.
+
+        Args:
+            device_id: device id or ids
+            category: category or categories
+            code: DP code or codes, the listener only gets status changes
+                of these codes; add_device, remove_device and attribute
+                changes reach it whatever their codes
+        """
+        if device_id is None and category is None and code is None:
+            self.device_listeners.add(listener)
+        else:
+            self.device_subscriptions.add(
+                listener, device_id=device_id, category=category, code=code
+            )
 
     def remove_device_listener(self, listener: TuyaDeviceListener):
-        """Remove device listener."""
-        self.device_listeners.remove(listener)
+        """Remove device listener, with every subscription it has.
+
+        Raises:
+            KeyError: if listener was not added
+        """
+        subscribed = self.device_subscriptions.remove(listener)
+        if listener in self.device_listeners:
+            self.device_listeners.remove(listener)
+        elif not subscribed:
+            raise KeyError(listener)
 
     ##############################
     # OpenAPI
@@ -334,6 +785,10 @@ class TuyaDeviceManager:
     def get_device_list_info(self, devIds: list[str]) -> dict[str, Any]:
         """Get devices info.
 
+        Any number of ids is accepted, they are fetched in parallel batches
+        and merged into one response, with total recounted and without the
+        paging fields of a single batch.
+
         Args:
           device_id(list): device id list
 
@@ -341,7 +796,7 @@ class TuyaDeviceManager:
             response: response body
 
         """
-        return self.device_manage.get_device_list_info(devIds)
+        return self.__batch_request(self.device_manage.get_device_list_info, devIds)
 
     # def updateDeviceInfo(self, device_id: str, info) -> dict[str, Any]:
     # """Update device information
@@ -419,13 +874,42 @@ class TuyaDeviceManager:
     def get_device_list_status(self, devIds: list[str]) -> dict[str, Any]:
         """Get devices status.
 
+        Any number of ids is accepted, they are fetched in parallel batches
+        and merged into one response.
+
         Args:
           devIds(list): device ids
 
         Returns:
             response: response body
         """
-        return self.device_manage.get_device_list_status(devIds)
+        return self.__batch_request(
+            self.device_manage.get_device_list_status, devIds
+        )
+
+    def __batch_request(
+        self, request: Callable[[list[str]], dict[str, Any]], devIds: list[str]
+    ) -> dict[str, Any]:
+        responses = self.__batch_responses(request, devIds)
+        if len(responses) == 1:
+            return responses[0]
+        return _merge_batch_responses(responses)
+
+    def __batch_responses(
+        self, request: Callable[[list[str]], dict[str, Any]], devIds: list[str]
+    ) -> list[dict[str, Any]]:
+        devIds = list(dict.fromkeys(devIds))
+        batches = [
+            devIds[i : i + self.batch_size]
+            for i in range(0, len(devIds), self.batch_size)
+        ]
+        if len(batches) <= 1:
+            return [request(devIds)]
+
+        with ThreadPoolExecutor(
+            max_workers=min(self.batch_workers, len(batches))
+        ) as executor:
+            return list(executor.map(request, batches))
 
     # Device Control
     # https://developer.tuya.com/docs/cloud/industrial-general-device-control/5d2e6fbe8e?id=Kag2t6n3ony2c
@@ -506,6 +990,59 @@ class TuyaDeviceManager:
         return self.device_manage.get_device_stream_allocate(device_id, stream_type)
 
 
+# Paging fields of a list response, meaningless once batches are merged.
+_BATCH_PAGING_KEYS = ("has_more", "last_row_key")
+
+
+def _merge_batch_result(merged: Any, result: Any) -> Any:
+    if merged is None:
+        return result
+    if isinstance(merged, list) and isinstance(result, list):
+        return merged + result
+    if isinstance(merged, dict) and isinstance(result, dict):
+        for (key, value) in result.items():
+            if isinstance(value, list) and isinstance(merged.get(key), list):
+                # New lists, SmartHome results alias "list" and "devices".
+                merged[key] = merged[key] + value
+            else:
+                merged.setdefault(key, value)
+    return merged
+
+
+def _merge_batch_responses(responses: list[dict[str, Any]]) -> dict[str, Any]:
+    """Merge batch responses into one, failed if any batch failed."""
+    merged = {"success": True}
+    for response in responses:
+        if response is None:
+            response = {"success": False}
+
+        if not response.get("success", False) and merged["success"]:
+            merged["success"] = False
+            merged["code"] = response.get("code")
+            merged["msg"] = response.get("msg")
+
+        if "t" in response:
+            # As old as its oldest batch, values are not stamped newer
+            # than they were read.
+            merged["t"] = min(merged.get("t", response["t"]), response["t"])
+
+        if "result" in response:
+            merged["result"] = _merge_batch_result(
+                merged.get("result"), response["result"]
+            )
+
+    result = merged.get("result")
+    if isinstance(result, dict):
+        # Scalars came from the first batch: the total is recounted and the
+        # paging fields, which only made sense for that batch, dropped.
+        for key in _BATCH_PAGING_KEYS:
+            result.pop(key, None)
+        items = result.get("list", result.get("devices"))
+        if "total" in result and isinstance(items, list):
+            result["total"] = len(items)
+    return merged
+
+
 class DeviceManage(metaclass=ABCMeta):
     api: TuyaOpenAPI
 
@@ -0,0 +1,340 @@
+"""Tuya open mq message dispatch."""
+from __future__ import annotations
+
+import queue
+import threading
+import zlib
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable
+
+from .openlogging import logger
+
+# What submit does when the queue is full.
+OVERFLOW_BLOCK = "block"
+OVERFLOW_DROP_NEW = "drop_new"
+OVERFLOW_DROP_OLDEST = "drop_oldest"
+
+DEFAULT_QUEUE_SIZE = 10000
+
+# Events whose handling sleeps or calls the cloud.
+DEFERRED_BIZ_CODES = frozenset(["bindUser"])
+
+# Max frames a worker takes from the queue and decodes in one call.
+DECODE_BATCH_SIZE = 32
+
+# Batches decoded ahead of routing in sharded mode, per worker.
+DECODE_WINDOW_PER_WORKER = 2
+
+_STOP = object()
+
+
+def shard_of(device_id: str | None, shards: int) -> int:
+    """Shard of a device, stable across runs unlike hash()."""
+    if not device_id:
+        return 0
+    return zlib.crc32(device_id.encode("utf8")) % shards
+
+
+class TuyaMQDispatcher:
+    """Tuya mq dispatcher.
+
+    Decouples the mqtt network thread from message handling: the network
+    thread only puts received frames on a bounded queue, and worker threads
+    decode them, a batch of the queued frames at a time, and call the
+    listeners. Events with a bizCode in
+    deferred_biz_codes are handed to a separate pool, so their slow handling
+    does not hold up device reports.
+
+    Unsharded, workers take frames as they come. With one worker, messages
+    are handled in arrival order. More workers raise throughput but messages
+    of one device may be handled out of order.
+
+    Sharded, workers only decode, in parallel, and a router hands the
+    messages in arrival order to one of shards threads picked by devId. Each
+    device is always handled by the same shard, so its messages keep their
+    order while different devices are handled concurrently. Shards are
+    threads and not processes because listeners update in-process state,
+    such as the device map of TuyaDeviceManager.
+
+    When the queue is full, overflow decides: OVERFLOW_BLOCK makes the
+    network thread wait, which pushes back on the broker connection,
+    OVERFLOW_DROP_NEW drops the incoming frame and OVERFLOW_DROP_OLDEST the
+    oldest queued one. Drops are counted in dropped.
+
+    Typical usage example:
+
+    dispatcher = TuyaMQDispatcher(workers=2, shards=8)
+    openmq = TuyaOpenMQ(openapi, dispatcher)
+    """
+
+    def __init__(
+        self,
+        workers: int = 1,
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+        overflow: str = OVERFLOW_BLOCK,
+        deferred_biz_codes: frozenset[str] = DEFERRED_BIZ_CODES,
+        deferred_workers: int = 2,
+        shards: int = 0,
+    ) -> None:
+        """Init TuyaMQDispatcher.
+
+        Args:
+            workers (int): threads handling messages, decoding them if sharded
+            queue_size (int): max frames waiting for a worker
+            overflow (str): OVERFLOW_BLOCK, OVERFLOW_DROP_NEW or
+                OVERFLOW_DROP_OLDEST
+            deferred_biz_codes (frozenset): bizCodes handled on the deferred pool
+            deferred_workers (int): threads of the deferred pool
+            shards (int): threads handling messages by device, 0 to not shard
+        """
+        if overflow not in (OVERFLOW_BLOCK, OVERFLOW_DROP_NEW, OVERFLOW_DROP_OLDEST):
+            raise ValueError(f"unknown overflow policy: {overflow}")
+        self.workers = workers
+        self.queue_size = queue_size
+        self.overflow = overflow
+        self.deferred_biz_codes = deferred_biz_codes
+        self.deferred_workers = deferred_workers
+        self.shards = shards
+
+        self.dropped = 0
+        self.processed = 0
+        self.deferred = 0
+
+        self.__queue: queue.Queue = queue.Queue(queue_size)
+        self.__shard_queues: list[queue.Queue] = []
+        self.__threads: list[threading.Thread] = []
+        self.__decode_pool: ThreadPoolExecutor | None = None
+        self.__deferred_pool: ThreadPoolExecutor | None = None
+        self.__decoder: Callable[[list[Any]], list[Any]] | None = None
+        self.__handler: Callable[[dict[str, Any]], None] | None = None
+        self.__lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        """Whether workers are running."""
+        return bool(self.__threads)
+
+    def qsize(self) -> int:
+        """Frames waiting for a worker."""
+        return self.__queue.qsize()
+
+    def shard_depths(self) -> list[int]:
+        """Messages waiting in each shard, empty if not sharded."""
+        return [shard_queue.qsize() for shard_queue in self.__shard_queues]
+
+    def start(
+        self,
+        decoder: Callable[[list[Any]], list[dict[str, Any] | None]],
+        handler: Callable[[dict[str, Any]], None],
+    ):
+        """Start workers.
+
+        Args:
+            decoder: turns a batch of submitted frames into their messages,
+                None for each frame to skip
+            handler: called with each message
+        """
+        if self.running:
+            return
+        self.__decoder = decoder
+        self.__handler = handler
+        self.__deferred_pool = ThreadPoolExecutor(
+            self.deferred_workers, thread_name_prefix="tuya-mq-deferred"
+        )
+        if not self.shards:
+            self.__threads = [
+                threading.Thread(
+                    target=self.__work, name=f"tuya-mq-worker-{i}", daemon=True
+                )
+                for i in range(self.workers)
+            ]
+        else:
+            self.__decode_pool = ThreadPoolExecutor(
+                self.workers, thread_name_prefix="tuya-mq-decode"
+            )
+            shard_size = max(self.queue_size // self.shards, 1)
+            self.__shard_queues = [
+                queue.Queue(shard_size) for _ in range(self.shards)
+            ]
+            self.__threads = [
+                threading.Thread(
+                    target=self.__work_shard,
+                    args=(shard_queue,),
+                    name=f"tuya-mq-shard-{i}",
+                    daemon=True,
+                )
+                for (i, shard_queue) in enumerate(self.__shard_queues)
+            ]
+            self.__threads.append(
+                threading.Thread(
+                    target=self.__route, name="tuya-mq-router", daemon=True
+                )
+            )
+        for thread in self.__threads:
+            thread.start()
+
+    def stop(self, timeout: float | None = None):
+        """Stop workers once the queued frames are handled."""
+        threads, self.__threads = self.__threads, []
+        if not threads:
+            return
+        # The router passes the stop on to the shards.
+        for _ in range(1 if self.shards else len(threads)):
+            self.__queue.put(_STOP)
+        for thread in threads:
+            thread.join(timeout)
+        for pool in (self.__decode_pool, self.__deferred_pool):
+            if pool is not None:
+                pool.shutdown(wait=False)
+        self.__decode_pool = None
+        self.__deferred_pool = None
+        self.__shard_queues = []
+
+    def submit(self, item: Any) -> bool:
+        """Queue item for the workers.
+
+        Returns:
+            False if the item was dropped
+        """
+        if self.overflow == OVERFLOW_BLOCK:
+            self.__queue.put(item)
+            return True
+
+        while True:
+            try:
+                self.__queue.put_nowait(item)
+                return True
+            except queue.Full:
+                if self.overflow == OVERFLOW_DROP_NEW:
+                    self.__count_drop()
+                    return False
+            try:
+                self.__queue.get_nowait()
+                self.__queue.task_done()
+                self.__count_drop()
+            except queue.Empty:
+                pass
+
+    def is_deferred(self, msg: dict[str, Any]) -> bool:
+        """Whether msg is an event to handle on the deferred pool."""
+        data = msg.get("data")
+        return (
+            isinstance(data, dict) and data.get("bizCode") in self.deferred_biz_codes
+        )
+
+    def defer(self, func: Callable[..., Any], *args: Any):
+        """Run func on the deferred pool, inline if it is not running."""
+        with self.__lock:
+            self.deferred += 1
+        if self.__deferred_pool is None:
+            func(*args)
+            return
+        self.__deferred_pool.submit(self.__call, func, *args)
+
+    def join(self):
+        """Block until every queued frame is handled."""
+        self.__queue.join()
+
+    def __count_drop(self):
+        with self.__lock:
+            self.dropped += 1
+            dropped = self.dropped
+        # Log the first drop and then every 1000th, not every frame.
+        if dropped % 1000 == 1:
+            logger.warning(f"mq dispatch queue full, {dropped} messages dropped")
+
+    @staticmethod
+    def __call(func: Callable[..., Any], *args: Any):
+        try:
+            func(*args)
+        except Exception as e:
+            logger.exception(f"mq deferred handler failed: {e}")
+
+    def __take(self, block: bool = True) -> list[Any]:
+        # Waits for a frame, then takes those already queued, up to a batch.
+        try:
+            items = [self.__queue.get(block)]
+        except queue.Empty:
+            return []
+        while items[-1] is not _STOP and len(items) < DECODE_BATCH_SIZE:
+            try:
+                items.append(self.__queue.get_nowait())
+            except queue.Empty:
+                break
+        return items
+
+    def __decode(self, items: list[Any]) -> list[dict[str, Any] | None]:
+        try:
+            return self.__decoder(items)
+        except Exception as e:
+            logger.exception(f"mq decode failed: {e}")
+            return [None] * len(items)
+
+    def __handle(self, msg: dict[str, Any]):
+        try:
+            if self.is_deferred(msg):
+                self.defer(self.__handler, msg)
+            else:
+                self.__handler(msg)
+        except Exception as e:
+            logger.exception(f"mq handler failed: {e}")
+        with self.__lock:
+            self.processed += 1
+
+    def __work(self):
+        while True:
+            items = self.__take()
+            stopping = items[-1] is _STOP
+            frames = items[:-1] if stopping else items
+            try:
+                for msg in self.__decode(frames) if frames else ():
+                    if msg is not None:
+                        self.__handle(msg)
+            finally:
+                for _ in items:
+                    self.__queue.task_done()
+            if stopping:
+                return
+
+    def __route(self):
+        # Batches decode ahead on the pool, results are routed in arrival order.
+        pending: deque[Future] = deque()
+        window = self.workers * DECODE_WINDOW_PER_WORKER
+        stopping = False
+        while True:
+            if not stopping and len(pending) < window:
+                items = self.__take(block=not pending)
+                if items and items[-1] is _STOP:
+                    items.pop()
+                    self.__queue.task_done()
+                    stopping = True
+                if items:
+                    pending.append(self.__decode_pool.submit(self.__decode, items))
+                    continue
+
+            if not pending:
+                if stopping:
+                    for shard_queue in self.__shard_queues:
+                        shard_queue.put(_STOP)
+                    return
+                continue
+
+            for msg in pending.popleft().result():
+                if msg is None:
+                    self.__queue.task_done()
+                    continue
+                data = msg.get("data")
+                device_id = data.get("devId") if isinstance(data, dict) else None
+                self.__shard_queues[shard_of(device_id, self.shards)].put(msg)
+
+    def __work_shard(self, shard_queue: queue.Queue):
+        while True:
+            msg = shard_queue.get()
+            if msg is _STOP:
+                return
+            try:
+                self.__handle(msg)
+            finally:
+                # The frame counts as done once its message is handled.
+                self.__queue.task_done()
@@ -0,0 +1,1118 @@
+"""Local stand-in of the Tuya cloud, for offline load tests and benchmarks."""
+from __future__ import annotations
+
+import base64
+import hashlib
+import hmac
+import json
+import random
+import re
+import socket
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable
+from urllib.parse import parse_qsl, urlsplit
+
+from Crypto.Cipher import AES
+
+from .openapi import EMPTY_CONTENT_SHA256
+from .tuya_enums import AuthType
+
+GCM_IV_LENGTH = 12
+MQ_TOPIC_PREFIX = "cloud/token/in/"
+
+FAKE_ACCESS_ID = "fake-access-id"
+FAKE_ACCESS_SECRET = "fake-access-secret"
+
+TUYA_ERROR_CODE_SIGN_INVALID = 1004
+TUYA_ERROR_CODE_TOKEN_INVALID = 1010
+TUYA_ERROR_CODE_PERMISSION_DENY = 1106
+TUYA_ERROR_CODE_NOT_FOUND = 2001
+
+
+def _range(minimum: int, maximum: int, scale: int = 0, unit: str = "") -> str:
+    return json.dumps(
+        {"min": minimum, "max": maximum, "scale": scale, "step": 1, "unit": unit}
+    )
+
+
+_BOOLEAN = ("Boolean", "{}")
+
+# category -> (functions, status only), each {code: (type, values)}
+CATEGORY_SPECIFICATIONS = {
+    "kg": (
+        {"switch_1": _BOOLEAN, "countdown_1": ("Integer", _range(0, 86400, unit="s"))},
+        {},
+    ),
+    "dj": (
+        {
+            "switch_led": _BOOLEAN,
+            "work_mode": ("Enum", json.dumps({"range": ["white", "colour", "scene"]})),
+            "bright_value_v2": ("Integer", _range(10, 1000)),
+            "temp_value_v2": ("Integer", _range(0, 1000)),
+        },
+        {},
+    ),
+    "cz": (
+        {"switch_1": _BOOLEAN},
+        {
+            "cur_power": ("Integer", _range(0, 50000, 1, "W")),
+            "cur_current": ("Integer", _range(0, 30000, unit="mA")),
+            "cur_voltage": ("Integer", _range(0, 5000, 1, "V")),
+        },
+    ),
+    "wsdcg": (
+        {},
+        {
+            "va_temperature": ("Integer", _range(-200, 600, 1, "℃")),
+            "va_humidity": ("Integer", _range(0, 100, unit="%")),
+        },
+    ),
+    "qt": ({}, {}),
+}
+
+
+def _random_value(type_: str, values: str, rand: random.Random) -> Any:
+    if type_ == "Boolean":
+        return rand.random() < 0.5
+    values = json.loads(values)
+    if type_ == "Integer":
+        return rand.randint(values["min"], values["max"])
+    if type_ == "Enum":
+        return rand.choice(values["range"])
+    return ""
+
+
+def make_specification(category: str) -> dict[str, Any]:
+    """Specification of a category, as returned by the specification api."""
+    (functions, status_only) = CATEGORY_SPECIFICATIONS[category]
+    return {
+        "category": category,
+        "functions": [
+            {"code": code, "type": type_, "values": values}
+            for (code, (type_, values)) in functions.items()
+        ],
+        "status": [
+            {"code": code, "type": type_, "values": values}
+            for (code, (type_, values)) in {**functions, **status_only}.items()
+        ],
+    }
+
+
+def make_fleet(
+    count: int,
+    categories: tuple[str, ...] = ("kg", "dj", "cz", "wsdcg"),
+    products_per_category: int = 3,
+    seed: int = 0,
+) -> list[dict[str, Any]]:
+    """Generate devices with the attributes of the device list api.
+
+    Args:
+        count (int): number of devices
+        categories (tuple): categories, assigned round robin
+        products_per_category (int): distinct product ids per category
+        seed (int): random seed, the same seed gives the same fleet
+
+    Returns:
+        device dicts, status as a list of {code, value}
+    """
+    rand = random.Random(seed)
+    now = int(time.time())
+    devices = []
+    for i in range(count):
+        category = categories[i % len(categories)]
+        product = (i // len(categories)) % products_per_category
+        specification = make_specification(category)
+        devices.append(
+            {
+                "id": f"fake{i:08d}{category}",
+                "name": f"{category} {i}",
+                "local_key": f"{rand.getrandbits(64):016x}",
+                "category": category,
+                "product_id": f"fakeproduct{category}{product}",
+                "product_name": f"fake {category} {product}",
+                "sub": False,
+                "uuid": uuid.UUID(int=rand.getrandbits(128)).hex,
+                "asset_id": "",
+                "online": True,
+                "icon": "",
+                "ip": "127.0.0.1",
+                "time_zone": "+00:00",
+                "active_time": now,
+                "create_time": now,
+                "update_time": now,
+                "status": [
+                    {
+                        "code": status["code"],
+                        "value": _random_value(status["type"], status["values"], rand),
+                    }
+                    for status in specification["status"]
+                ],
+            }
+        )
+    return devices
+
+
+def encrypt_mq_message(
+    data: dict[str, Any], password: str, t: int, auth_type: AuthType
+) -> str:
+    """Encrypt an mq message body the way the cloud does.
+
+    SMART_HOME messages use AES-ECB with PKCS7 padding, CUSTOM ones AES-GCM
+    framed as iv length, iv, ciphertext and tag, with t as associated data.
+    """
+    key = password[8:24].encode("utf8")
+    plaintext = json.dumps(data, separators=(",", ":")).encode("utf8")
+    if auth_type == AuthType.SMART_HOME:
+        padding = AES.block_size - len(plaintext) % AES.block_size
+        ciphertext = AES.new(key, AES.MODE_ECB).encrypt(
+            plaintext + bytes([padding]) * padding
+        )
+        return base64.b64encode(ciphertext).decode("utf8")
+
+    iv = random.getrandbits(GCM_IV_LENGTH * 8).to_bytes(GCM_IV_LENGTH, "big")
+    cipher = AES.new(key, AES.MODE_GCM, nonce=iv)
+    cipher.update(str(t).encode("utf8"))
+    (ciphertext, tag) = cipher.encrypt_and_digest(plaintext)
+    return base64.b64encode(
+        len(iv).to_bytes(4, "big") + iv + ciphertext + tag
+    ).decode("utf8")
+
+
+def topic_matches(topic_filter: str, topic: str) -> bool:
+    """Whether an mqtt topic filter, with + and # wildcards, matches topic."""
+    filter_levels = topic_filter.split("/")
+    topic_levels = topic.split("/")
+    for (i, level) in enumerate(filter_levels):
+        if level == "#":
+            return True
+        if i >= len(topic_levels) or (level != "+" and level != topic_levels[i]):
+            return False
+    return len(filter_levels) == len(topic_levels)
+
+
+class TuyaFakeMQTTBroker:
+    """Minimal MQTT 3.1.1 broker.
+
+    Supports what TuyaOpenMQ uses: CONNECT with username and password,
+    SUBSCRIBE, UNSUBSCRIBE, PINGREQ, DISCONNECT, and QoS 0 PUBLISH from the
+    broker to subscribers. Clients publishing to the broker are accepted and
+    ignored.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0) -> None:
+        """Init TuyaFakeMQTTBroker, port 0 picks a free port."""
+        self.__server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.__server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.__server.bind((host, port))
+        self.__server.listen()
+        (self.host, self.port) = self.__server.getsockname()[:2]
+        self.__credentials: dict[str, str] = {}
+        # client socket -> topic filters
+        self.__subscriptions: dict[socket.socket, set[str]] = {}
+        self.__send_locks: dict[socket.socket, threading.Lock] = {}
+        self.__lock = threading.Lock()
+        self.__thread: threading.Thread | None = None
+
+    @property
+    def url(self) -> str:
+        """Url of the broker, in the form TuyaMQConfig expects."""
+        return f"tcp://{self.host}:{self.port}"
+
+    def allow(self, username: str, password: str):
+        """Accept connections with username and password."""
+        with self.__lock:
+            self.__credentials[username] = password
+
+    def start(self):
+        """Accept connections on a background thread."""
+        self.__thread = threading.Thread(target=self.__accept_loop, daemon=True)
+        self.__thread.start()
+
+    def stop(self):
+        """Close the listening socket and all connections."""
+        try:
+            # Wakes the accept loop, close alone does not.
+            self.__server.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.__server.close()
+        self.disconnect_clients()
+
+    def disconnect_clients(self):
+        """Drop all client connections, as a network failure would."""
+        with self.__lock:
+            clients = list(self.__subscriptions)
+            self.__subscriptions.clear()
+        for conn in clients:
+            try:
+                conn.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            conn.close()
+
+    def subscriber_count(self, topic: str) -> int:
+        """Count connections subscribed to topic."""
+        with self.__lock:
+            return sum(
+                1
+                for filters in self.__subscriptions.values()
+                if any(topic_matches(f, topic) for f in filters)
+            )
+
+    def publish(self, topic: str, payload: bytes) -> int:
+        """Publish payload to subscribers of topic with QoS 0.
+
+        Returns:
+            number of connections the message was sent to
+        """
+        topic_bytes = topic.encode("utf8")
+        packet = (
+            b"\x30"
+            + self.__encode_length(2 + len(topic_bytes) + len(payload))
+            + len(topic_bytes).to_bytes(2, "big")
+            + topic_bytes
+            + payload
+        )
+        with self.__lock:
+            targets = [
+                (conn, self.__send_locks[conn])
+                for (conn, filters) in self.__subscriptions.items()
+                if any(topic_matches(f, topic) for f in filters)
+            ]
+        sent = 0
+        for (conn, send_lock) in targets:
+            try:
+                with send_lock:
+                    conn.sendall(packet)
+                sent += 1
+            except OSError:
+                self.__drop(conn)
+        return sent
+
+    @staticmethod
+    def __encode_length(length: int) -> bytes:
+        encoded = bytearray()
+        while True:
+            (length, digit) = divmod(length, 128)
+            encoded.append(digit | 0x80 if length else digit)
+            if not length:
+                return bytes(encoded)
+
+    @staticmethod
+    def __recv_exact(conn: socket.socket, size: int) -> bytes:
+        data = b""
+        while len(data) < size:
+            chunk = conn.recv(size - len(data))
+            if not chunk:
+                raise ConnectionError("connection closed")
+            data += chunk
+        return data
+
+    def __read_packet(self, conn: socket.socket) -> tuple[int, bytes]:
+        header = self.__recv_exact(conn, 1)[0]
+        (length, multiplier) = (0, 1)
+        while True:
+            digit = self.__recv_exact(conn, 1)[0]
+            length += (digit & 0x7F) * multiplier
+            multiplier *= 128
+            if not digit & 0x80:
+                break
+        return header, self.__recv_exact(conn, length)
+
+    @staticmethod
+    def __read_string(data: bytes, offset: int) -> tuple[str, int]:
+        length = int.from_bytes(data[offset: offset + 2], "big")
+        end = offset + 2 + length
+        return data[offset + 2: end].decode("utf8"), end
+
+    def __drop(self, conn: socket.socket):
+        with self.__lock:
+            self.__subscriptions.pop(conn, None)
+            self.__send_locks.pop(conn, None)
+        conn.close()
+
+    def __accept_loop(self):
+        while True:
+            try:
+                (conn, _) = self.__server.accept()
+            except OSError:
+                return
+            threading.Thread(target=self.__serve, args=(conn,), daemon=True).start()
+
+    def __connect(self, conn: socket.socket, body: bytes) -> bool:
+        (_, offset) = self.__read_string(body, 0)
+        flags = body[offset + 1]
+        offset += 4
+        (_, offset) = self.__read_string(body, offset)  # client id
+        if flags & 0x04:
+            (_, offset) = self.__read_string(body, offset)  # will topic
+            (_, offset) = self.__read_string(body, offset)  # will message
+        username = password = None
+        if flags & 0x80:
+            (username, offset) = self.__read_string(body, offset)
+        if flags & 0x40:
+            (password, offset) = self.__read_string(body, offset)
+
+        with self.__lock:
+            accepted = (
+                username is not None and self.__credentials.get(username) == password
+            )
+            if accepted:
+                self.__subscriptions[conn] = set()
+                self.__send_locks[conn] = threading.Lock()
+        # 5: not authorised
+        conn.sendall(bytes([0x20, 2, 0, 0 if accepted else 5]))
+        return accepted
+
+    def __serve(self, conn: socket.socket):
+        try:
+            (header, body) = self.__read_packet(conn)
+            if header >> 4 != 1 or not self.__connect(conn, body):
+                conn.close()
+                return
+
+            while True:
+                (header, body) = self.__read_packet(conn)
+                packet_type = header >> 4
+                with self.__lock:
+                    send_lock = self.__send_locks.get(conn)
+                if send_lock is None:
+                    return
+                if packet_type == 8:  # SUBSCRIBE
+                    (offset, topics) = (2, [])
+                    while offset < len(body):
+                        (topic, offset) = self.__read_string(body, offset)
+                        topics.append(topic)
+                        offset += 1
+                    with self.__lock:
+                        self.__subscriptions.get(conn, set()).update(topics)
+                    with send_lock:
+                        conn.sendall(
+                            b"\x90"
+                            + self.__encode_length(2 + len(topics))
+                            + body[:2]
+                            + bytes(len(topics))
+                        )
+                elif packet_type == 10:  # UNSUBSCRIBE
+                    (offset, topics) = (2, [])
+                    while offset < len(body):
+                        (topic, offset) = self.__read_string(body, offset)
+                        topics.append(topic)
+                    with self.__lock:
+                        self.__subscriptions.get(conn, set()).difference_update(topics)
+                    with send_lock:
+                        conn.sendall(b"\xb0\x02" + body[:2])
+                elif packet_type == 3:  # PUBLISH, acknowledged and ignored
+                    qos = (header >> 1) & 0x03
+                    if qos:
+                        (_, offset) = self.__read_string(body, 0)
+                        with send_lock:
+                            conn.sendall(b"\x40\x02" + body[offset: offset + 2])
+                elif packet_type == 12:  # PINGREQ
+                    with send_lock:
+                        conn.sendall(b"\xd0\x00")
+                elif packet_type == 14:  # DISCONNECT
+                    break
+        except (ConnectionError, OSError):
+            pass
+        self.__drop(conn)
+
+
+class _FakeCloudError(Exception):
+    def __init__(self, code: int, msg: str) -> None:
+        super().__init__(msg)
+        self.code = code
+        self.msg = msg
+
+
+class TuyaFakeCloud:
+    """Tuya cloud stand-in.
+
+    Serves the open api endpoints the SDK uses over plain http and pushes
+    encrypted device reports through a local MQTT broker, so the SDK can be
+    load tested on one machine. Requests are signed and checked the same way
+    as TuyaOpenAPI._calculate_sign computes them. Latency and errors can be
+    injected on the http side.
+
+    Typical usage example:
+
+    with TuyaFakeCloud(make_fleet(1000)) as cloud:
+        openapi = TuyaOpenAPI(cloud.endpoint, cloud.access_id, cloud.access_secret)
+        openapi.connect("user", "password", "1", "tuyaSmart")
+        cloud.report("fake00000000kg", {"switch_1": True})
+    """
+
+    def __init__(
+        self,
+        devices: list[dict[str, Any]] | None = None,
+        access_id: str = FAKE_ACCESS_ID,
+        access_secret: str = FAKE_ACCESS_SECRET,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float | tuple[float, float] = 0,
+        error_rate: float = 0,
+        error_status: int = 503,
+        token_expire: int = 2 * 60 * 60,
+        mq_expire: int = 2 * 60 * 60,
+        asset_size: int = 100,
+        scene_count: int = 3,
+        remotes_per_hub: int = 2,
+        check_sign: bool = True,
+        seed: int = 0,
+    ) -> None:
+        """Init TuyaFakeCloud.
+
+        Args:
+            devices (list): device dicts, see make_fleet, 100 devices if None
+            access_id (str): accepted client id
+            access_secret (str): secret requests must be signed with
+            host (str): address to listen on
+            port (int): http port, 0 picks a free port
+            latency (float | tuple): seconds added to every response, or a
+                (min, max) range to draw from
+            error_rate (float): share of requests answered with error_status
+            error_status (int): http status of injected errors
+            token_expire (int): seconds an access token is valid
+            mq_expire (int): seconds an mq config is valid
+            asset_size (int): devices per asset in the asset tree
+            scene_count (int): scenes in the user's home
+            remotes_per_hub (int): infrared remotes of each "qt" device
+            check_sign (bool): reject requests with an invalid signature
+            seed (int): random seed of injected latency and errors
+        """
+        self.access_id = access_id
+        self.access_secret = access_secret
+        self.latency = latency
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.token_expire = token_expire
+        self.mq_expire = mq_expire
+        self.check_sign = check_sign
+        self.uid = "fakeuid0001"
+
+        self.devices: dict[str, dict[str, Any]] = {
+            device["id"]: device
+            for device in (devices if devices is not None else make_fleet(100))
+        }
+        self.__device_ids = list(self.devices)
+        self.assets = self.__make_assets(asset_size)
+        self.home_id = 1
+        self.scenes = [
+            {
+                "scene_id": f"fakescene{i}",
+                "name": f"scene {i}",
+                "enabled": True,
+                "actions": [],
+            }
+            for i in range(scene_count)
+        ]
+        self.remotes_per_hub = remotes_per_hub
+
+        self.request_count = 0
+        self.sign_failures = 0
+        self.injected_errors = 0
+        self.triggered: list[tuple[str, Any]] = []
+
+        self.__random = random.Random(seed)
+        self.__lock = threading.Lock()
+        # access token -> expire time, refresh token -> access token
+        self.__access_tokens: dict[str, float] = {}
+        self.__refresh_tokens: dict[str, str] = {}
+        # topic -> (password, auth type) of issued mq configs
+        self.__mq_configs: dict[str, tuple[str, AuthType]] = {}
+
+        self.broker = TuyaFakeMQTTBroker(host)
+        self.__routes = self.__make_routes()
+        cloud = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body are written separately, do not let Nagle hold
+            # the body back on kept-alive connections.
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def __handle(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                (status, content) = cloud._handle(
+                    self.command, self.path, dict(self.headers), body
+                )
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+
+            do_GET = do_POST = do_PUT = do_DELETE = __handle
+
+        self.__server = ThreadingHTTPServer((host, port), Handler)
+        self.__server.daemon_threads = True
+        (self.host, self.port) = self.__server.server_address[:2]
+
+    @property
+    def endpoint(self) -> str:
+        """Endpoint to pass to TuyaOpenAPI."""
+        return f"http://{self.host}:{self.port}"
+
+    def start(self):
+        """Serve http and mqtt on background threads."""
+        self.broker.start()
+        threading.Thread(target=self.__server.serve_forever, daemon=True).start()
+
+    def stop(self):
+        """Stop serving."""
+        self.__server.shutdown()
+        self.__server.server_close()
+        self.broker.stop()
+
+    def __enter__(self) -> TuyaFakeCloud:
+        """Start and return the cloud."""
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        """Stop the cloud."""
+        self.stop()
+
+    def expire_tokens(self):
+        """Invalidate all access tokens, the next call answers 1010."""
+        with self.__lock:
+            self.__access_tokens.clear()
+
+    ##############################
+    # MQ
+
+    def report(
+        self, device_id: str, status: dict[str, Any], t: int | None = None
+    ) -> int:
+        """Update device status and publish a device report.
+
+        Returns:
+            number of mq connections the report was sent to
+        """
+        t = t if t is not None else int(time.time() * 1000)
+        device = self.devices[device_id]
+        current = {item["code"]: item for item in device["status"]}
+        for (code, value) in status.items():
+            if code in current:
+                current[code]["value"] = value
+            else:
+                device["status"].append({"code": code, "value": value})
+        return self.publish(
+            4,
+            {
+                "dataId": uuid.uuid4().hex,
+                "devId": device_id,
+                "productKey": device["product_id"],
+                "status": [
+                    {"code": code, "value": value, "t": t}
+                    for (code, value) in status.items()
+                ],
+            },
+            t,
+        )
+
+    def event(
+        self,
+        device_id: str,
+        biz_code: str,
+        biz_data: dict[str, Any] | None = None,
+        t: int | None = None,
+    ) -> int:
+        """Publish a device event such as online, offline or nameUpdate.
+
+        Returns:
+            number of mq connections the event was sent to
+        """
+        t = t if t is not None else int(time.time() * 1000)
+        device = self.devices.get(device_id)
+        if device is not None:
+            if biz_code in ("online", "offline"):
+                device["online"] = biz_code == "online"
+            elif biz_code == "nameUpdate":
+                device["name"] = (biz_data or {}).get("name", device["name"])
+        return self.publish(
+            20,
+            {
+                "devId": device_id,
+                "bizCode": biz_code,
+                "bizData": biz_data or {},
+                "ts": t,
+            },
+            t,
+        )
+
+    def publish(self, protocol: int, data: dict[str, Any], t: int) -> int:
+        """Encrypt data for every issued mq config and publish it."""
+        with self.__lock:
+            configs = list(self.__mq_configs.items())
+        sent = 0
+        for (topic, (password, auth_type)) in configs:
+            if not self.broker.subscriber_count(topic):
+                continue
+            payload = {
+                "protocol": protocol,
+                "pv": "2.0" if auth_type == AuthType.CUSTOM else "1.0",
+                "sign": "",
+                "t": t,
+                "data": encrypt_mq_message(data, password, t, auth_type),
+            }
+            sent += self.broker.publish(
+                topic, json.dumps(payload, separators=(",", ":")).encode("utf8")
+            )
+        return sent
+
+    ##############################
+    # Http
+
+    def _handle(
+        self, method: str, raw_path: str, headers: dict[str, str], body: bytes
+    ) -> tuple[int, bytes]:
+        url = urlsplit(raw_path)
+        params = dict(parse_qsl(url.query, keep_blank_values=True))
+        with self.__lock:
+            self.request_count += 1
+            inject_error = self.error_rate and self.__random.random() < self.error_rate
+            if isinstance(self.latency, tuple):
+                latency = self.__random.uniform(*self.latency)
+            else:
+                latency = self.latency
+        if latency:
+            time.sleep(latency)
+        if inject_error:
+            with self.__lock:
+                self.injected_errors += 1
+            return self.error_status, b""
+
+        try:
+            result = self.__dispatch(method, url.path, params, headers, body)
+            response = {
+                "success": True,
+                "result": result,
+                "t": int(time.time() * 1000),
+            }
+        except _FakeCloudError as e:
+            response = {
+                "success": False,
+                "code": e.code,
+                "msg": e.msg,
+                "t": int(time.time() * 1000),
+            }
+        return 200, json.dumps(response, separators=(",", ":")).encode("utf8")
+
+    def __verify_sign(
+        self,
+        method: str,
+        path: str,
+        params: dict[str, str],
+        headers: dict[str, str],
+        body: bytes,
+    ) -> str:
+        headers = {key.lower(): value for (key, value) in headers.items()}
+        if headers.get("client_id") != self.access_id:
+            raise _FakeCloudError(TUYA_ERROR_CODE_SIGN_INVALID, "clientId invalid")
+        access_token = headers.get("access_token", "")
+        if not self.check_sign:
+            return access_token
+
+        content_sha256 = (
+            hashlib.sha256(body).hexdigest() if body else EMPTY_CONTENT_SHA256
+        )
+        url = path
+        if params:
+            url += "?" + "&".join(f"{key}={params[key]}" for key in sorted(params))
+        message = (
+            f"{self.access_id}{access_token}{headers.get('t', '')}"
+            f"{method}\n{content_sha256}\n\n{url}"
+        )
+        sign = (
+            hmac.new(
+                self.access_secret.encode("utf8"),
+                msg=message.encode("utf8"),
+                digestmod=hashlib.sha256,
+            )
+            .hexdigest()
+            .upper()
+        )
+        if not hmac.compare_digest(sign, headers.get("sign", "")):
+            with self.__lock:
+                self.sign_failures += 1
+            raise _FakeCloudError(TUYA_ERROR_CODE_SIGN_INVALID, "sign invalid")
+        return access_token
+
+    def __dispatch(
+        self,
+        method: str,
+        path: str,
+        params: dict[str, str],
+        headers: dict[str, str],
+        body: bytes,
+    ) -> Any:
+        access_token = self.__verify_sign(method, path, params, headers, body)
+        payload = json.loads(body) if body else {}
+        for (route_method, pattern, token_path, handler) in self.__routes:
+            if route_method != method:
+                continue
+            match = pattern.match(path)
+            if match is None:
+                continue
+            if not token_path:
+                with self.__lock:
+                    expire = self.__access_tokens.get(access_token)
+                if expire is None or expire < time.time():
+                    raise _FakeCloudError(
+                        TUYA_ERROR_CODE_TOKEN_INVALID, "token invalid"
+                    )
+            return handler(*match.groups(), params=params, body=payload)
+        raise _FakeCloudError(TUYA_ERROR_CODE_NOT_FOUND, f"no api {method} {path}")
+
+    def __make_routes(self) -> list[tuple[str, re.Pattern, bool, Callable]]:
+        token_routes = [
+            ("POST", "/v1.0/iot-01/associated-users/actions/authorized-login"),
+            ("POST", "/v1.0/iot-03/users/login"),
+            ("GET", "/v1.0/token/([^/]+)"),
+            ("POST", "/v1.0/iot-03/users/token/([^/]+)"),
+        ]
+        routes = [
+            ("POST", token_routes[0][1], self.__login),
+            ("POST", token_routes[1][1], self.__login),
+            ("GET", token_routes[2][1], self.__refresh),
+            ("POST", token_routes[3][1], self.__refresh),
+            ("POST", "/v1.0/open-hub/access/config", self.__mq_config),
+            ("POST", "/v1.0/iot-03/open-hub/access-config", self.__mq_config),
+            ("GET", "/v1.0/users/[^/]+/devices", self.__user_devices),
+            ("GET", "/v1.0/devices/?", self.__devices),
+            ("GET", "/v1.0/devices/factory-infos", self.__factory_infos),
+            ("GET", "/v1.0/iot-03/devices/factory-infos", self.__factory_infos),
+            ("GET", "/v1.0/iot-03/devices", self.__iot_devices),
+            ("GET", "/v1.0/iot-03/devices/status", self.__iot_devices_status),
+            ("GET", "/v1.0/devices/([^/]+)", self.__device),
+            ("GET", "/v1.0/iot-03/devices/([^/]+)", self.__iot_device),
+            ("GET", "/v1.0/iot-03/devices/([^/]+)/status", self.__device_status),
+            ("GET", "/v1.0/devices/([^/]+)/specifications", self.__specification),
+            ("GET", "/v1.0/iot-03/devices/([^/]+)/specification", self.__specification),
+            ("GET", "/v1.0/devices/([^/]+)/functions", self.__functions),
+            ("GET", "/v1.0/iot-03/devices/([^/]+)/functions", self.__functions),
+            ("GET", "/v1.0/functions/([^/]+)", self.__category_functions),
+            (
+                "GET",
+                "/v1.0/iot-03/categories/([^/]+)/functions",
+                self.__category_functions,
+            ),
+            ("POST", "/v1.0/devices/([^/]+)/commands", self.__commands),
+            ("POST", "/v1.0/iot-03/devices/([^/]+)/commands", self.__commands),
+            ("GET", "/v1.0/iot-02/assets/([^/]+)", self.__asset),
+            ("GET", "/v1.0/iot-02/assets/([^/]+)/sub-assets", self.__sub_assets),
+            ("GET", "/v1.0/iot-02/assets/([^/]+)/devices", self.__asset_devices),
+            ("GET", "/v1.0/users/[^/]+/homes", self.__homes),
+            ("GET", "/v1.0/homes/([^/]+)/scenes", self.__scenes),
+            ("POST", "/v1.0/homes/([^/]+)/scenes/([^/]+)/trigger", self.__trigger),
+            ("GET", "/v1.0/infrareds/([^/]+)/remotes", self.__remotes),
+            ("GET", "/v1.0/infrareds/([^/]+)/remotes/([^/]+)/keys", self.__keys),
+            (
+                "POST",
+                "/v1.0/infrareds/([^/]+)/remotes/([^/]+)/command",
+                self.__remote_command,
+            ),
+        ]
+        return [
+            (method, re.compile(path + "$"), (method, path) in token_routes, handler)
+            for (method, path, handler) in routes
+        ]
+
+    def __issue_token(self) -> dict[str, Any]:
+        access_token = uuid.uuid4().hex
+        refresh_token = uuid.uuid4().hex
+        with self.__lock:
+            self.__access_tokens[access_token] = time.time() + self.token_expire
+            self.__refresh_tokens[refresh_token] = access_token
+        return {
+            "access_token": access_token,
+            "refresh_token": refresh_token,
+            "expire_time": self.token_expire,
+            "uid": self.uid,
+            "platform_url": self.endpoint,
+        }
+
+    def __login(self, params: dict, body: dict) -> dict[str, Any]:
+        if not body.get("username") or not body.get("password"):
+            raise _FakeCloudError(TUYA_ERROR_CODE_PERMISSION_DENY, "login failed")
+        return self.__issue_token()
+
+    def __refresh(self, refresh_token: str, params: dict, body: dict) -> dict:
+        with self.__lock:
+            access_token = self.__refresh_tokens.pop(refresh_token, None)
+            if access_token is not None:
+                self.__access_tokens.pop(access_token, None)
+        if access_token is None:
+            raise _FakeCloudError(TUYA_ERROR_CODE_TOKEN_INVALID, "token invalid")
+        return self.__issue_token()
+
+    def __mq_config(self, params: dict, body: dict) -> dict[str, Any]:
+        auth_type = (
+            AuthType.CUSTOM
+            if body.get("msg_encrypted_version") == "2.0"
+            else AuthType.SMART_HOME
+        )
+        client_id = f"fakemq{uuid.uuid4().hex[:16]}"
+        username = f"fakeuser{uuid.uuid4().hex[:8]}"
+        password = uuid.uuid4().hex
+        topic = f"{MQ_TOPIC_PREFIX}{client_id}"
+        self.broker.allow(username, password)
+        with self.__lock:
+            self.__mq_configs[topic] = (password, auth_type)
+        return {
+            "url": self.broker.url,
+            "client_id": client_id,
+            "username": username,
+            "password": password,
+            "source_topic": {"device": topic},
+            "sink_topic": {},
+            "expire_time": self.mq_expire,
+        }
+
+    def __get_device(self, device_id: str) -> dict[str, Any]:
+        device = self.devices.get(device_id)
+        if device is None:
+            raise _FakeCloudError(TUYA_ERROR_CODE_NOT_FOUND, "device not found")
+        return device
+
+    def __copy_device(self, device: dict[str, Any], status: bool = True) -> dict:
+        copy = dict(device)
+        if status:
+            copy["status"] = [dict(item) for item in device["status"]]
+        else:
+            copy.pop("status", None)
+        return copy
+
+    def __ids(self, params: dict[str, str]) -> list[str]:
+        return [
+            device_id
+            for device_id in params.get("device_ids", "").split(",")
+            if device_id in self.devices
+        ]
+
+    def __user_devices(self, params: dict, body: dict) -> list[dict[str, Any]]:
+        return [self.__copy_device(device) for device in self.devices.values()]
+
+    def __devices(self, params: dict, body: dict) -> dict[str, Any]:
+        ids = self.__ids(params)
+        return {
+            "devices": [self.__copy_device(self.devices[i]) for i in ids],
+            "total": len(ids),
+        }
+
+    def __iot_devices(self, params: dict, body: dict) -> dict[str, Any]:
+        ids = self.__ids(params)
+        return {
+            "list": [self.__copy_device(self.devices[i], False) for i in ids],
+            "total": len(ids),
+        }
+
+    def __iot_devices_status(self, params: dict, body: dict) -> list[dict]:
+        return [
+            {"id": i, "status": self.__copy_device(self.devices[i])["status"]}
+            for i in self.__ids(params)
+        ]
+
+    def __factory_infos(self, params: dict, body: dict) -> list[dict[str, Any]]:
+        return [
+            {"id": i, "uuid": self.devices[i]["uuid"], "sn": "", "mac": ""}
+            for i in self.__ids(params)
+        ]
+
+    def __device(self, device_id: str, params: dict, body: dict) -> dict:
+        return self.__copy_device(self.__get_device(device_id))
+
+    def __iot_device(self, device_id: str, params: dict, body: dict) -> dict:
+        return self.__copy_device(self.__get_device(device_id), False)
+
+    def __device_status(self, device_id: str, params: dict, body: dict) -> list:
+        return self.__copy_device(self.__get_device(device_id))["status"]
+
+    def __specification(self, device_id: str, params: dict, body: dict) -> dict:
+        return make_specification(self.__get_device(device_id)["category"])
+
+    def __functions(self, device_id: str, params: dict, body: dict) -> dict:
+        return self.__category_functions(
+            self.__get_device(device_id)["category"], params, body
+        )
+
+    def __category_functions(self, category: str, params: dict, body: dict) -> dict:
+        if category not in CATEGORY_SPECIFICATIONS:
+            raise _FakeCloudError(TUYA_ERROR_CODE_NOT_FOUND, "category not found")
+        specification = make_specification(category)
+        return {
+            "category": category,
+            "functions": [
+                dict(function, name=function["code"], desc="")
+                for function in specification["functions"]
+            ],
+        }
+
+    def __commands(self, device_id: str, params: dict, body: dict) -> bool:
+        self.__get_device(device_id)
+        status = {
+            command["code"]: command["value"] for command in body.get("commands", [])
+        }
+        # Devices confirm commands with a report, as real ones do.
+        threading.Thread(
+            target=self.report, args=(device_id, status), daemon=True
+        ).start()
+        return True
+
+    def __make_assets(self, asset_size: int) -> dict[str, dict[str, Any]]:
+        # Root asset "-1" holds one asset per asset_size devices.
+        assets = {"-1": {"asset_id": "-1", "asset_name": "root", "children": []}}
+        for start in range(0, len(self.__device_ids), max(asset_size, 1)):
+            asset_id = f"fakeasset{start // max(asset_size, 1)}"
+            device_ids = self.__device_ids[start: start + asset_size]
+            assets[asset_id] = {
+                "asset_id": asset_id,
+                "asset_name": asset_id,
+                "parent_asset_id": "-1",
+                "children": [],
+                "device_ids": device_ids,
+            }
+            assets["-1"]["children"].append(asset_id)
+            for device_id in device_ids:
+                self.devices[device_id]["asset_id"] = asset_id
+        return assets
+
+    @staticmethod
+    def __page(items: list, params: dict[str, str]) -> dict[str, Any]:
+        start = int(params.get("last_row_key") or 0)
+        size = int(params.get("page_size") or 20)
+        end = start + size
+        return {
+            "list": items[start:end],
+            "has_next": end < len(items),
+            "last_row_key": str(end),
+            "total_size": len(items),
+        }
+
+    def __get_asset(self, asset_id: str) -> dict[str, Any]:
+        asset = self.assets.get(asset_id)
+        if asset is None:
+            raise _FakeCloudError(TUYA_ERROR_CODE_NOT_FOUND, "asset not found")
+        return asset
+
+    def __asset(self, asset_id: str, params: dict, body: dict) -> dict[str, Any]:
+        asset = self.__get_asset(asset_id)
+        return {
+            "asset_id": asset["asset_id"],
+            "asset_name": asset["asset_name"],
+            "parent_asset_id": asset.get("parent_asset_id", ""),
+        }
+
+    def __sub_assets(self, asset_id: str, params: dict, body: dict) -> dict:
+        children = [
+            self.__asset(child, params, body)
+            for child in self.__get_asset(asset_id)["children"]
+        ]
+        return self.__page(children, params)
+
+    def __asset_devices(self, asset_id: str, params: dict, body: dict) -> dict:
+        devices = [
+            {"device_id": device_id}
+            for device_id in self.__get_asset(asset_id).get("device_ids", [])
+        ]
+        return self.__page(devices, params)
+
+    def __homes(self, params: dict, body: dict) -> list[dict[str, Any]]:
+        return [{"home_id": self.home_id, "name": "fake home"}]
+
+    def __scenes(self, home_id: str, params: dict, body: dict) -> list[dict]:
+        return [dict(scene) for scene in self.scenes]
+
+    def __trigger(
+        self, home_id: str, scene_id: str, params: dict, body: dict
+    ) -> bool:
+        with self.__lock:
+            self.triggered.append(("scene", scene_id))
+        return True
+
+    def __remotes(self, hub_id: str, params: dict, body: dict) -> list[dict]:
+        self.__get_device(hub_id)
+        return [
+            {
+                "remote_id": f"{hub_id}remote{i}",
+                "remote_name": f"remote {i}",
+                "category_id": "2",
+                "brand_id": "1",
+                "brand_name": "fake",
+                "remote_index": i,
+            }
+            for i in range(self.remotes_per_hub)
+        ]
+
+    def __keys(
+        self, hub_id: str, remote_id: str, params: dict, body: dict
+    ) -> dict[str, Any]:
+        return {
+            "category_id": 2,
+            "brand_id": 1,
+            "remote_index": 0,
+            "single_air": False,
+            "duplicate_power": False,
+            "key_list": [
+                {"key": key, "key_id": i, "key_name": key, "standard_key": True}
+                for (i, key) in enumerate(["power", "ok", "up", "down"])
+            ],
+        }
+
+    def __remote_command(
+        self, hub_id: str, remote_id: str, params: dict, body: dict
+    ) -> bool:
+        with self.__lock:
+            self.triggered.append(("infrared", (hub_id, remote_id, body.get("key"))))
+        return True
+
+
+def _main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run a local Tuya cloud stand-in.")
+    parser.add_argument("--devices", type=int, default=100)
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency", type=float, default=0)
+    parser.add_argument("--error-rate", type=float, default=0)
+    parser.add_argument(
+        "--report-rate", type=float, default=0, help="device reports per second"
+    )
+    args = parser.parse_args()
+
+    cloud = TuyaFakeCloud(
+        make_fleet(args.devices),
+        port=args.port,
+        latency=args.latency,
+        error_rate=args.error_rate,
+    )
+    cloud.start()
+    print(
+        f"fake cloud on {cloud.endpoint}, mqtt on {cloud.broker.url}, "
+        f"access id {cloud.access_id}, access secret {cloud.access_secret}"
+    )
+    device_ids = list(cloud.devices)
+    try:
+        while True:
+            if not args.report_rate:
+                time.sleep(1)
+                continue
+            device = cloud.devices[random.choice(device_ids)]
+            code = device["status"][0]["code"] if device["status"] else None
+            if code is not None:
+                cloud.report(device["id"], {code: device["status"][0]["value"]})
+            time.sleep(1 / args.report_rate)
+    except KeyboardInterrupt:
+        cloud.stop()
+
+
+if __name__ == "__main__":
+    _main()
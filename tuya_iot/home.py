@@ -41,8 +41,12 @@ class TuyaHomeManager:
         self.device_manager = device_manager
 
     def update_device_cache(self):
-        """Update home's devices cache."""
-        self.device_manager.device_map.clear()
+        """Update home's devices cache.
+
+        Devices no longer in the cloud are dropped once the update is done,
+        so a device map loaded from the store stays usable meanwhile.
+        """
+        previous_ids = set(self.device_manager.device_map.keys())
         if self.api.auth_type == AuthType.CUSTOM:
             device_ids = []
             asset_manager = TuyaAssetManager(self.api)
@@ -56,7 +60,13 @@ class TuyaHomeManager:
             if device_ids:
                 self.device_manager.update_device_caches(device_ids)
         elif self.api.auth_type == AuthType.SMART_HOME:
-            self.device_manager.update_device_list_in_smart_home()
+            device_ids = self.device_manager.update_device_list_in_smart_home()
+            if device_ids is None:
+                return
+
+        self.device_manager._remove_device_caches(
+            list(previous_ids.difference(device_ids))
+        )
 
     def __query_device_ids(
         self, asset_manager: TuyaAssetManager, asset_id: str, device_ids: list
@@ -0,0 +1,284 @@
+"""Tuya open api instrumentation."""
+from __future__ import annotations
+
+import threading
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Any
+
+DEFAULT_LATENCY_BUCKETS = (0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# Path segments followed by an id, and words that may follow them but are
+# not ids themselves.
+_ID_COLLECTIONS = frozenset(
+    [
+        "assets",
+        "categories",
+        "devices",
+        "functions",
+        "homes",
+        "infrareds",
+        "remotes",
+        "scenes",
+        "token",
+        "users",
+    ]
+)
+_STATIC_SEGMENTS = frozenset(["factory-infos", "login", "status", "token"])
+
+
+def normalize_path(path: str) -> str:
+    """Path template of an api path.
+
+    Ids are replaced with {id}, so metrics have one series per endpoint,
+    e.g. /v1.0/devices/vdevo123/commands -> /v1.0/devices/{id}/commands.
+    """
+    segments = path.split("/")
+    for i in range(1, len(segments)):
+        segment = segments[i]
+        if (
+            segment
+            and segments[i - 1] in _ID_COLLECTIONS
+            and segment not in _STATIC_SEGMENTS
+        ):
+            segments[i] = "{id}"
+    return "/".join(segments)
+
+
+class TuyaRequestHook:
+    """Tuya open api request hook.
+
+    Subclass and override the callbacks of interest, then register the hook
+    with TuyaOpenAPI.add_hook. Callbacks run on the calling thread (or event
+    loop) for every http attempt, so retries are reported one by one.
+    Exceptions raised by a hook are logged and never fail the request.
+    """
+
+    def before_request(self, method: str, path: str, params: Any):
+        """Called before each http attempt."""
+
+    def after_response(
+        self,
+        method: str,
+        path: str,
+        status_code: int,
+        result: dict[str, Any] | None,
+        elapsed: float,
+        bytes_out: int,
+        bytes_in: int,
+    ):
+        """Called after each http response.
+
+        Args:
+            method (str): http method
+            path (str): api path
+            status_code (int): http status code
+            result (map): decoded response body, None for http errors and
+                responses that are retried
+            elapsed (float): seconds from sending to the response
+            bytes_out (int): request body size
+            bytes_in (int): response body size
+        """
+
+    def on_error(self, method: str, path: str, error: Exception, elapsed: float):
+        """Called when an http attempt fails without a response."""
+
+    def on_token_refresh(self, success: bool):
+        """Called after each access token refresh."""
+
+
+class TuyaMetrics(TuyaRequestHook):
+    """In-process metrics collector.
+
+    Records per endpoint latency histograms, http status and Tuya code
+    counters, error counters, bytes in and out and token refreshes.
+    Endpoints are keyed by method and path template, see normalize_path.
+
+    Typical usage example:
+
+    metrics = TuyaMetrics()
+    openapi.add_hook(metrics)
+    print(prometheus_text(metrics))
+    """
+
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_LATENCY_BUCKETS) -> None:
+        """Init TuyaMetrics.
+
+        Args:
+            buckets (tuple): upper bounds in seconds of the latency buckets
+        """
+        self.buckets = tuple(sorted(buckets))
+        self.__lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Drop all recorded values."""
+        with self.__lock:
+            # (method, path) -> [bucket counts..., +Inf count], sum
+            self.latency: dict[tuple[str, str], list[int]] = {}
+            self.latency_sum: dict[tuple[str, str], float] = defaultdict(float)
+            self.requests: dict[tuple[str, str], int] = defaultdict(int)
+            self.statuses: dict[tuple[str, str, int], int] = defaultdict(int)
+            self.codes: dict[tuple[str, str, str], int] = defaultdict(int)
+            self.errors: dict[tuple[str, str, str], int] = defaultdict(int)
+            self.bytes_out: dict[tuple[str, str], int] = defaultdict(int)
+            self.bytes_in: dict[tuple[str, str], int] = defaultdict(int)
+            self.token_refreshes: dict[bool, int] = defaultdict(int)
+
+    def snapshot(self) -> dict[str, Any]:
+        """Consistent copy of all recorded values, keyed by attribute name."""
+        with self.__lock:
+            return {
+                "latency": {
+                    key: list(counts) for (key, counts) in self.latency.items()
+                },
+                "latency_sum": dict(self.latency_sum),
+                "requests": dict(self.requests),
+                "statuses": dict(self.statuses),
+                "codes": dict(self.codes),
+                "errors": dict(self.errors),
+                "bytes_out": dict(self.bytes_out),
+                "bytes_in": dict(self.bytes_in),
+                "token_refreshes": dict(self.token_refreshes),
+            }
+
+    def __observe(self, key: tuple[str, str], elapsed: float):
+        counts = self.latency.get(key)
+        if counts is None:
+            counts = self.latency[key] = [0] * (len(self.buckets) + 1)
+        counts[bisect_left(self.buckets, elapsed)] += 1
+        self.latency_sum[key] += elapsed
+
+    def before_request(self, method: str, path: str, params: Any):
+        """Count the attempt."""
+        key = (method, normalize_path(path))
+        with self.__lock:
+            self.requests[key] += 1
+
+    def after_response(
+        self,
+        method: str,
+        path: str,
+        status_code: int,
+        result: dict[str, Any] | None,
+        elapsed: float,
+        bytes_out: int,
+        bytes_in: int,
+    ):
+        """Record latency, status, code and sizes."""
+        key = (method, normalize_path(path))
+        with self.__lock:
+            self.__observe(key, elapsed)
+            self.statuses[key + (status_code,)] += 1
+            if result is not None:
+                code = (
+                    "ok"
+                    if result.get("success", False)
+                    else str(result.get("code", "unknown"))
+                )
+                self.codes[key + (code,)] += 1
+            self.bytes_out[key] += bytes_out
+            self.bytes_in[key] += bytes_in
+
+    def on_error(self, method: str, path: str, error: Exception, elapsed: float):
+        """Record latency and the error type."""
+        key = (method, normalize_path(path))
+        with self.__lock:
+            self.__observe(key, elapsed)
+            self.errors[key + (type(error).__name__,)] += 1
+
+    def on_token_refresh(self, success: bool):
+        """Count the refresh."""
+        with self.__lock:
+            self.token_refreshes[success] += 1
+
+
+def _escape(value: Any) -> str:
+    return (
+        str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    )
+
+
+def _labels(**labels: Any) -> str:
+    return ",".join(f'{name}="{_escape(value)}"' for (name, value) in labels.items())
+
+
+def prometheus_text(metrics: TuyaMetrics, prefix: str = "tuya_openapi") -> str:
+    """Render metrics in the Prometheus text exposition format."""
+    lines = []
+
+    def header(name: str, kind: str, help_text: str):
+        lines.append(f"# HELP {prefix}_{name} {help_text}")
+        lines.append(f"# TYPE {prefix}_{name} {kind}")
+
+    def counter(name: str, help_text: str, values: dict, label_names: tuple):
+        header(name, "counter", help_text)
+        for (key, value) in sorted(values.items(), key=lambda item: str(item[0])):
+            labels = _labels(**dict(zip(label_names, key)))
+            lines.append(f"{prefix}_{name}{{{labels}}} {value}")
+
+    values = metrics.snapshot()
+    header("request_duration_seconds", "histogram", "Latency of http attempts.")
+    for (key, counts) in sorted(values["latency"].items()):
+        (method, path) = key
+        cumulative = 0
+        for (bound, count) in zip(metrics.buckets + ("+Inf",), counts):
+            cumulative += count
+            labels = _labels(method=method, path=path, le=bound)
+            lines.append(
+                f"{prefix}_request_duration_seconds_bucket{{{labels}}} "
+                f"{cumulative}"
+            )
+        labels = _labels(method=method, path=path)
+        total = values["latency_sum"][key]
+        lines.append(f"{prefix}_request_duration_seconds_sum{{{labels}}} {total}")
+        lines.append(
+            f"{prefix}_request_duration_seconds_count{{{labels}}} {cumulative}"
+        )
+
+    counter(
+        "requests_total",
+        "Http attempts sent.",
+        values["requests"],
+        ("method", "path"),
+    )
+    counter(
+        "responses_total",
+        "Http responses by status code.",
+        values["statuses"],
+        ("method", "path", "status"),
+    )
+    counter(
+        "codes_total",
+        "Decoded responses by Tuya code, ok for successes.",
+        values["codes"],
+        ("method", "path", "code"),
+    )
+    counter(
+        "errors_total",
+        "Http attempts that failed without a response.",
+        values["errors"],
+        ("method", "path", "error"),
+    )
+    counter(
+        "sent_bytes_total",
+        "Request body bytes sent.",
+        values["bytes_out"],
+        ("method", "path"),
+    )
+    counter(
+        "received_bytes_total",
+        "Response body bytes received.",
+        values["bytes_in"],
+        ("method", "path"),
+    )
+    counter(
+        "token_refreshes_total",
+        "Access token refreshes.",
+        {
+            ("success" if success else "failure",): count
+            for (success, count) in values["token_refreshes"].items()
+        },
+        ("result",),
+    )
+    return "\n".join(lines) + "\n"
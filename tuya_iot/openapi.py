@@ -3,13 +3,23 @@ from __future__ import annotations
 
 import hashlib
 import hmac
-import json
+import logging
+import random
+import threading
 import time
-from typing import Any
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Iterator
 
 import requests
 
+from .cache import TuyaResponseCache, request_key
+from .codec import TuyaJSONCodec, default_codec
+from .metrics import TuyaRequestHook
 from .openlogging import filter_logger, logger
+from .scheduler import TuyaRequestScheduler
+from .singleflight import TuyaSingleFlight
+from .transport import RequestsTransport, TuyaResponse, TuyaTransport
 from .tuya_enums import AuthType
 from .version import VERSION
 
@@ -21,6 +31,54 @@ TO_C_SMART_HOME_REFRESH_TOKEN_API = "/v1.0/token/"
 TO_C_CUSTOM_TOKEN_API = "/v1.0/iot-03/users/login"
 TO_C_SMART_HOME_TOKEN_API = "/v1.0/iot-01/associated-users/actions/authorized-login"
 
+EMPTY_CONTENT_SHA256 = hashlib.sha256(b"").hexdigest()
+
+DEFAULT_CONNECT_TIMEOUT = 5
+DEFAULT_READ_TIMEOUT = 10
+DEFAULT_MAX_RETRIES = 2
+DEFAULT_RETRY_BACKOFF = 0.5
+
+IDEMPOTENT_METHODS = frozenset(("GET", "PUT", "DELETE"))
+RETRY_STATUS_CODES = frozenset((429, 500, 502, 503, 504))
+
+_deadline: ContextVar[float | None] = ContextVar("tuya_iot_deadline", default=None)
+
+
+@contextmanager
+def call_deadline(timeout: float | None) -> Iterator[None]:
+    """Bound every request made inside to timeout seconds in total.
+
+    Token refresh, re-login, retries and waiting on coalesced calls all
+    count against it. Nested deadlines never extend an outer one.
+    """
+    if timeout is None:
+        yield
+        return
+
+    deadline = time.monotonic() + timeout
+    outer = _deadline.get()
+    if outer is not None:
+        deadline = min(deadline, outer)
+
+    token = _deadline.set(deadline)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining_time() -> float | None:
+    """Seconds left before the current call deadline, None without one."""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+def retry_delay(attempt: int, backoff: float) -> float:
+    """Full-jitter exponential backoff of a retry attempt."""
+    return random.uniform(0, backoff * (2 ** attempt))
+
 
 class TuyaTokenInfo:
     """Tuya token info.
@@ -47,12 +105,114 @@ class TuyaTokenInfo:
         self.platform_url = result.get("platform_url", "")
 
 
-class TuyaOpenAPI:
-    """Open Api.
+class TuyaTokenManager:
+    """Tuya token manager.
 
-    Typical usage example:
+    Makes token refresh and re-login single-flight: the first caller that
+    notices an expiring or invalid token does the work under a lock, the
+    others wait for it and reuse the new token. Optionally refreshes the
+    token in the background before it enters the expiry window.
 
-    openapi = TuyaOpenAPI(ENDPOINT, ACCESS_ID, ACCESS_KEY)
+    Attributes:
+        api: tuya openapi
+        background_refresh: refresh on a timer before expiry
+        refresh_margin: seconds before expiry the background refresh runs
+        refresh_count: number of successful token refreshes
+    """
+
+    def __init__(
+        self,
+        api: TuyaOpenAPI,
+        background_refresh: bool = False,
+        refresh_margin: int = 5 * 60,
+    ) -> None:
+        """Init TuyaTokenManager."""
+        self.api = api
+        self.background_refresh = background_refresh
+        self.refresh_margin = refresh_margin
+        self.refresh_count = 0
+        self.__lock = threading.Lock()
+        self.__timer: threading.Timer | None = None
+
+    def refresh_if_need(self, path: str):
+        """Refresh the access token if it is about to expire."""
+        if not self.api._need_refresh_token(path):
+            return
+
+        with self.__acquire():
+            # Another thread may have refreshed while we were waiting.
+            if not self.api._need_refresh_token(path):
+                return
+            self.__refresh()
+
+    def relogin(self, stale_token_info: TuyaTokenInfo | None):
+        """Login again after the cloud rejected stale_token_info."""
+        with self.__acquire():
+            if self.api.token_info is not stale_token_info:
+                return
+            self.api._handle_login_response(
+                self.api.post(*self.api._relogin_request())
+            )
+
+    @contextmanager
+    def __acquire(self) -> Iterator[None]:
+        remaining = remaining_time()
+        if not self.__lock.acquire(
+            timeout=-1 if remaining is None else max(remaining, 0)
+        ):
+            raise requests.exceptions.Timeout("deadline exceeded waiting for token")
+        try:
+            yield
+        finally:
+            self.__lock.release()
+
+    def schedule_refresh(self):
+        """(Re)start the background refresh timer for the current token."""
+        self.cancel()
+        if not self.background_refresh or not self.api.is_connect():
+            return
+
+        token_info = self.api.token_info
+        delay = (token_info.expire_time - int(time.time() * 1000)) / 1000
+        delay = max(delay - self.refresh_margin, 0)
+
+        self.__timer = threading.Timer(delay, self.__background_refresh, (token_info,))
+        self.__timer.daemon = True
+        self.__timer.start()
+
+    def cancel(self):
+        """Cancel the pending background refresh."""
+        if self.__timer is not None:
+            self.__timer.cancel()
+            self.__timer = None
+
+    def __background_refresh(self, token_info: TuyaTokenInfo):
+        with self.__lock:
+            # Token replaced by a refresh or login in the meantime.
+            if self.api.token_info is not token_info:
+                return
+            try:
+                self.__refresh()
+            except Exception as e:
+                logger.exception(e)
+
+    def __refresh(self):
+        method, refresh_path = self.api._refresh_token_request()
+        if method == "POST":
+            response = self.api.post(refresh_path)
+        else:
+            response = self.api.get(refresh_path)
+
+        if self.api._handle_refresh_response(response):
+            self.refresh_count += 1
+            self.schedule_refresh()
+
+class TuyaOpenAPIBase:
+    """Open Api base.
+
+    Signing, token, retry and response handling shared by TuyaOpenAPI and
+    AsyncTuyaOpenAPI. Sending is left to them, one blocks and the other
+    awaits, so neither is a subtype of the other.
     """
 
     def __init__(
@@ -62,9 +222,19 @@ class TuyaOpenAPI:
         access_secret: str,
         auth_type: AuthType = AuthType.SMART_HOME,
         lang: str = "en",
+        scheduler: TuyaRequestScheduler | None = None,
+        response_cache: TuyaResponseCache | None = None,
+        connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+        read_timeout: float = DEFAULT_READ_TIMEOUT,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        retry_backoff: float = DEFAULT_RETRY_BACKOFF,
+        codec: TuyaJSONCodec | None = None,
+        hooks: list[TuyaRequestHook] | None = None,
     ) -> None:
-        """Init TuyaOpenAPI."""
-        self.session = requests.session()
+        """Init TuyaOpenAPIBase, see TuyaOpenAPI for the arguments."""
+        self.codec = codec if codec is not None else default_codec()
+        self.__hmac_secret: str | None = None
+        self.__hmac = None
 
         self.endpoint = endpoint
         self.access_id = access_id
@@ -80,6 +250,14 @@ class TuyaOpenAPI:
         self.token_info: TuyaTokenInfo = None
 
         self.dev_channel: str = ""
+        self.scheduler = scheduler
+        self.response_cache = response_cache
+
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.hooks: list[TuyaRequestHook] = list(hooks) if hooks else []
 
         self.__username = ""
         self.__password = ""
@@ -92,129 +270,97 @@ class TuyaOpenAPI:
         method: str,
         path: str,
         params: dict[str, Any] | None = None,
-        body: dict[str, Any] | None = None,
+        body: dict[str, Any] | bytes | None = None,
+        access_token: str | None = None,
     ) -> tuple[str, int]:
-
-        # HTTPMethod
-        str_to_sign = method
-        str_to_sign += "\n"
-
-        # Content-SHA256
-        content_to_sha256 = (
-            "" if body is None or len(body.keys()) == 0 else json.dumps(body)
+        # Content-SHA256, of the exact bytes sent.
+        if isinstance(body, dict):
+            body = self._encode_body(body)
+        content_sha256 = (
+            hashlib.sha256(body).hexdigest() if body else EMPTY_CONTENT_SHA256
         )
 
-        str_to_sign += (
-            hashlib.sha256(content_to_sha256.encode("utf8")).hexdigest().lower()
-        )
-        str_to_sign += "\n"
-
-        # Header
-        str_to_sign += "\n"
-
         # URL
-        str_to_sign += path
+        url = path
+        if params:
+            url += "?" + "&".join(f"{key}={params[key]}" for key in sorted(params))
 
-        if params is not None and len(params.keys()) > 0:
-            str_to_sign += "?"
-
-            params_keys = sorted(params.keys())
-            query_builder = "".join(f"{key}={params[key]}&" for key in params_keys)
-            str_to_sign += query_builder[:-1]
+        # HTTPMethod, Content-SHA256, Header, URL
+        str_to_sign = f"{method}\n{content_sha256}\n\n{url}"
 
         # Sign
         t = int(time.time() * 1000)
 
-        message = self.access_id
-        if self.token_info is not None:
-            message += self.token_info.access_token
-        message += str(t) + str_to_sign
-        sign = (
-            hmac.new(
-                self.access_secret.encode("utf8"),
-                msg=message.encode("utf8"),
-                digestmod=hashlib.sha256,
+        if access_token is None:
+            access_token = self.token_info.access_token if self.token_info else ""
+        message = f"{self.access_id}{access_token}{t}{str_to_sign}"
+
+        # Copy the keyed state instead of keying a new hmac per call.
+        if self.__hmac_secret != self.access_secret:
+            self.__hmac_secret = self.access_secret
+            self.__hmac = hmac.new(
+                self.access_secret.encode("utf8"), digestmod=hashlib.sha256
             )
-            .hexdigest()
-            .upper()
-        )
+        mac = self.__hmac.copy()
+        mac.update(message.encode("utf8"))
+        sign = mac.hexdigest().upper()
         return sign, t
 
-    def __refresh_access_token_if_need(self, path: str):
+    def _encode_body(self, body: dict[str, Any] | None) -> bytes | None:
+        if not body:
+            return None
+        return self.codec.dumps(body)
+
+    def _need_refresh_token(self, path: str) -> bool:
         if self.is_connect() is False:
-            return
+            return False
 
-        if path.startswith(self.__login_path):
-            return
+        if self._is_token_path(path):
+            return False
 
         # should use refresh token?
         now = int(time.time() * 1000)
         expired_time = self.token_info.expire_time
 
-        if expired_time - 60 * 1000 > now:  # 1min
-            return
-
-        self.token_info.access_token = ""
+        return expired_time - 60 * 1000 <= now  # 1min
 
+    def _refresh_token_request(self) -> tuple[str, str]:
         if self.auth_type == AuthType.CUSTOM:
-            response = self.post(
-                TO_C_CUSTOM_REFRESH_TOKEN_API + self.token_info.refresh_token
-            )
-        else:
-            response = self.get(
-                TO_C_SMART_HOME_REFRESH_TOKEN_API + self.token_info.refresh_token
-            )
-
-        self.token_info = TuyaTokenInfo(response)
+            return "POST", TO_C_CUSTOM_REFRESH_TOKEN_API + self.token_info.refresh_token
+        return "GET", TO_C_SMART_HOME_REFRESH_TOKEN_API + self.token_info.refresh_token
 
     def set_dev_channel(self, dev_channel: str):
         """Set dev channel."""
         self.dev_channel = dev_channel
 
-    def connect(
-        self,
-        username: str = "",
-        password: str = "",
-        country_code: str = "",
-        schema: str = "",
-    ) -> dict[str, Any]:
-        """Connect to Tuya Cloud.
-
-        Args:
-            username (str): user name in to C
-            password (str): user password in to C
-            country_code (str): country code in SMART_HOME
-            schema (str): app schema in SMART_HOME
-
-        Returns:
-            response: connect response
-        """
+    def _login_request(
+        self, username: str, password: str, country_code: str, schema: str
+    ) -> tuple[str, dict[str, Any]]:
         self.__username = username
         self.__password = password
         self.__country_code = country_code
         self.__schema = schema
 
         if self.auth_type == AuthType.CUSTOM:
-            response = self.post(
-                TO_C_CUSTOM_TOKEN_API,
-                {
-                    "username": username,
-                    "password": hashlib.sha256(password.encode("utf8"))
-                    .hexdigest()
-                    .lower(),
-                },
-            )
-        else:
-            response = self.post(
-                TO_C_SMART_HOME_TOKEN_API,
-                {
-                    "username": username,
-                    "password": hashlib.md5(password.encode("utf8")).hexdigest(),
-                    "country_code": country_code,
-                    "schema": schema,
-                },
-            )
+            return TO_C_CUSTOM_TOKEN_API, {
+                "username": username,
+                "password": hashlib.sha256(password.encode("utf8")).hexdigest().lower(),
+            }
+
+        return TO_C_SMART_HOME_TOKEN_API, {
+            "username": username,
+            "password": hashlib.md5(password.encode("utf8")).hexdigest(),
+            "country_code": country_code,
+            "schema": schema,
+        }
 
+    def _relogin_request(self) -> tuple[str, dict[str, Any]]:
+        self.token_info = None
+        return self._login_request(
+            self.__username, self.__password, self.__country_code, self.__schema
+        )
+
+    def _handle_login_response(self, response: dict[str, Any]) -> dict[str, Any]:
         if not response["success"]:
             return response
 
@@ -223,22 +369,45 @@ class TuyaOpenAPI:
 
         return response
 
+    def _handle_refresh_response(self, response: dict[str, Any] | None) -> bool:
+        """Take the new token from a refresh response, False if it failed."""
+        if not response or not response.get("success", False):
+            # Keep the current token, the cloud answers 1010 once it expires
+            # and the request path logs in again.
+            logger.error("refresh token failed")
+            self._emit("on_token_refresh", False)
+            return False
+
+        self.token_info = TuyaTokenInfo(response)
+        self._emit("on_token_refresh", True)
+        return True
+
     def is_connect(self) -> bool:
         """Is connect to tuya cloud."""
         return self.token_info is not None and len(self.token_info.access_token) > 0
 
-    def __request(
+    def _is_token_path(self, path: str) -> bool:
+        return (
+            path == self.__login_path
+            or path.startswith(TO_C_CUSTOM_REFRESH_TOKEN_API)
+            or path.startswith(TO_C_SMART_HOME_REFRESH_TOKEN_API)
+        )
+
+    def _build_headers(
         self,
         method: str,
         path: str,
         params: dict[str, Any] | None = None,
-        body: dict[str, Any] | None = None,
-    ) -> dict[str, Any]:
-
-        self.__refresh_access_token_if_need(path)
-
-        access_token = self.token_info.access_token if self.token_info else ""
-        sign, t = self._calculate_sign(method, path, params, body)
+        body: bytes | None = None,
+    ) -> dict[str, str]:
+        # Token APIs are signed without the access token.
+        is_token_path = self._is_token_path(path)
+        access_token = (
+            self.token_info.access_token
+            if self.token_info and not is_token_path
+            else ""
+        )
+        sign, t = self._calculate_sign(method, path, params, body, access_token)
         headers = {
             "client_id": self.access_id,
             "sign": sign,
@@ -248,46 +417,349 @@ class TuyaOpenAPI:
             "lang": self.lang,
         }
 
-        if path == self.__login_path or \
-            path.startswith(TO_C_CUSTOM_REFRESH_TOKEN_API) or\
-            path.startswith(TO_C_SMART_HOME_REFRESH_TOKEN_API):
+        if body:
+            headers["Content-Type"] = "application/json"
+
+        if is_token_path:
             headers["dev_lang"] = "python"
             headers["dev_version"] = VERSION
             headers["dev_channel"] = self.dev_channel
 
-        logger.debug(
-            f"Request: method = {method}, \
-                url = {self.endpoint + path},\
-                params = {params},\
-                body = {filter_logger(body)},\
-                t = {int(time.time()*1000)}"
-        )
+        return headers
 
-        response = self.session.request(
-            method, self.endpoint + path, params=params, json=body, headers=headers
-        )
+    def _scheduler_timeout(self) -> float | None:
+        """Longest wait for the scheduler that still leaves time to send."""
+        remaining = remaining_time()
+        return None if remaining is None else max(remaining, 0)
+
+    def _retry_delay(self, method: str, attempt: int) -> float | None:
+        """Backoff before the next retry, None if the call must not retry."""
+        if method not in IDEMPOTENT_METHODS or attempt >= self.max_retries:
+            return None
+
+        delay = retry_delay(attempt, self.retry_backoff)
+        remaining = remaining_time()
+        if remaining is not None and remaining <= delay:
+            return None
+        return delay
+
+    def _retry_after_error(
+        self, method: str, path: str, attempt: int, error: Exception, started: float
+    ) -> float | None:
+        """Backoff before retrying after a transport error, None to raise it."""
+        self._emit("on_error", method, path, error, time.monotonic() - started)
+        delay = self._retry_delay(method, attempt)
+        if delay is not None:
+            logger.warning(f"Request error: {error!r}, retry {method} {path}")
+        return delay
+
+    def _retry_after_response(
+        self,
+        method: str,
+        path: str,
+        attempt: int,
+        status_code: int,
+        content: bytes,
+        data: bytes | None,
+        elapsed: float,
+    ) -> float | None:
+        """Backoff before retrying a 429/5xx response, None to keep it."""
+        if status_code not in RETRY_STATUS_CODES:
+            return None
+        delay = self._retry_delay(method, attempt)
+        if delay is not None:
+            self._emit_response(method, path, status_code, content, data, elapsed)
+            logger.warning(
+                f"Response error: code={status_code}, retry {method} {path}"
+            )
+        return delay
 
-        if response.ok is False:
+    def _handle_response(
+        self,
+        method: str,
+        path: str,
+        status_code: int,
+        content: bytes,
+        data: bytes | None,
+        elapsed: float,
+    ) -> dict[str, Any] | None:
+        """Decode the final response of a call, None on an http error."""
+        if status_code >= 400:
+            self._emit_response(method, path, status_code, content, data, elapsed)
             logger.error(
-                f"Response error: code={response.status_code}, body={response.body}"
+                f"Response error: code={status_code}, "
+                f"body={content.decode('utf8', errors='replace')}"
             )
             return None
 
-        result = response.json()
+        result = self.codec.loads(content)
+        self._emit_response(method, path, status_code, content, data, elapsed, result)
 
-        logger.debug(
-            f"Response: {json.dumps(filter_logger(result), ensure_ascii=False, indent=2)}"
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "Response: %s",
+                self.codec.pretty(filter_logger(result)),
+            )
+        return result
+
+    def _needs_relogin(self, path: str, result: dict[str, Any] | None) -> bool:
+        """Whether the cloud rejected the token the call was made with."""
+        return (
+            result is not None
+            and result.get("code", -1) == TUYA_ERROR_CODE_TOKEN_INVALID
+            and not self._is_token_path(path)
         )
 
-        if result.get("code", -1) == TUYA_ERROR_CODE_TOKEN_INVALID:
-            self.token_info = None
-            self.connect(
-                self.__username, self.__password, self.__country_code, self.__schema
+    def add_hook(self, hook: TuyaRequestHook):
+        """Add request hook."""
+        self.hooks.append(hook)
+
+    def remove_hook(self, hook: TuyaRequestHook):
+        """Remove request hook."""
+        self.hooks.remove(hook)
+
+    def _emit(self, event: str, *args):
+        """Call event on every hook, a failing hook never fails the request."""
+        for hook in self.hooks:
+            try:
+                getattr(hook, event)(*args)
+            except Exception as e:
+                logger.exception(f"hook {event} failed: {e}")
+
+    def _emit_response(
+        self,
+        method: str,
+        path: str,
+        status_code: int,
+        content: bytes,
+        data: bytes | None,
+        elapsed: float,
+        result: dict[str, Any] | None = None,
+    ):
+        if self.hooks:
+            self._emit(
+                "after_response",
+                method,
+                path,
+                status_code,
+                result,
+                elapsed,
+                len(data) if data else 0,
+                len(content),
             )
 
+
+class TuyaOpenAPI(TuyaOpenAPIBase):
+    """Open Api.
+
+    Typical usage example:
+
+    openapi = TuyaOpenAPI(ENDPOINT, ACCESS_ID, ACCESS_KEY)
+    """
+
+    def __init__(
+        self,
+        endpoint: str,
+        access_id: str,
+        access_secret: str,
+        auth_type: AuthType = AuthType.SMART_HOME,
+        lang: str = "en",
+        background_token_refresh: bool = False,
+        scheduler: TuyaRequestScheduler | None = None,
+        response_cache: TuyaResponseCache | None = None,
+        coalesce_requests: bool = True,
+        connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+        read_timeout: float = DEFAULT_READ_TIMEOUT,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        retry_backoff: float = DEFAULT_RETRY_BACKOFF,
+        transport: TuyaTransport | None = None,
+        codec: TuyaJSONCodec | None = None,
+        hooks: list[TuyaRequestHook] | None = None,
+    ) -> None:
+        """Init TuyaOpenAPI.
+
+        Args:
+            background_token_refresh (bool): refresh the token on a timer
+                before it expires instead of on the first request after
+            scheduler (TuyaRequestScheduler): optional rate limiter, excess
+                calls wait for their turn instead of being throttled
+            response_cache (TuyaResponseCache): optional cache for read-mostly
+                GET responses
+            coalesce_requests (bool): share one in-flight GET between
+                concurrent callers with the same path and params; calls with a
+                deadline wait for one but never start one to share
+            connect_timeout (float): seconds to establish a connection
+            read_timeout (float): seconds to wait for response data
+            max_retries (int): retries of idempotent calls on connection
+                errors, timeouts and 429/5xx responses
+            retry_backoff (float): base seconds of the jittered backoff
+            transport (TuyaTransport): http transport, a pooled
+                RequestsTransport if not given
+            codec (TuyaJSONCodec): json codec for bodies and responses,
+                the fastest installed one if not given
+            hooks (list): TuyaRequestHook instances notified of every request
+        """
+        super().__init__(
+            endpoint,
+            access_id,
+            access_secret,
+            auth_type,
+            lang,
+            scheduler=scheduler,
+            response_cache=response_cache,
+            connect_timeout=connect_timeout,
+            read_timeout=read_timeout,
+            max_retries=max_retries,
+            retry_backoff=retry_backoff,
+            codec=codec,
+            hooks=hooks,
+        )
+        self.transport = transport if transport is not None else RequestsTransport()
+        self.session = getattr(self.transport, "session", None)
+        self.token_manager = TuyaTokenManager(self, background_token_refresh)
+        self.single_flight = (
+            TuyaSingleFlight(requests.exceptions.Timeout) if coalesce_requests else None
+        )
+
+    def connect(
+        self,
+        username: str = "",
+        password: str = "",
+        country_code: str = "",
+        schema: str = "",
+    ) -> dict[str, Any]:
+        """Connect to Tuya Cloud.
+
+        Args:
+            username (str): user name in to C
+            password (str): user password in to C
+            country_code (str): country code in SMART_HOME
+            schema (str): app schema in SMART_HOME
+
+        Returns:
+            response: connect response
+        """
+        response = self.post(
+            *self._login_request(username, password, country_code, schema)
+        )
+        return self._handle_login_response(response)
+
+    def _handle_login_response(self, response: dict[str, Any]) -> dict[str, Any]:
+        response = super()._handle_login_response(response)
+        if response["success"]:
+            self.token_manager.schedule_refresh()
+        return response
+
+    def _request_timeout(self) -> tuple[float, float]:
+        remaining = remaining_time()
+        if remaining is None:
+            return self.connect_timeout, self.read_timeout
+        if remaining <= 0:
+            raise requests.exceptions.Timeout("deadline exceeded")
+        return min(self.connect_timeout, remaining), min(self.read_timeout, remaining)
+
+    def __send(
+        self,
+        method: str,
+        path: str,
+        params: dict[str, Any] | None,
+        body: dict[str, Any] | None,
+        data: bytes | None,
+    ) -> TuyaResponse:
+        # Signed per attempt, the signature carries a timestamp.
+        timeout = self._request_timeout()
+        headers = self._build_headers(method, path, params, data)
+
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                f"Request: method = {method}, \
+                    url = {self.endpoint + path},\
+                    params = {params},\
+                    body = {filter_logger(body)},\
+                    t = {int(time.time()*1000)}"
+            )
+
+        return self.transport.request(
+            method,
+            self.endpoint + path,
+            params=params,
+            data=data,
+            headers=headers,
+            timeout=timeout,
+        )
+
+    def __request(
+        self,
+        method: str,
+        path: str,
+        params: dict[str, Any] | None = None,
+        body: dict[str, Any] | None = None,
+    ) -> dict[str, Any]:
+
+        use_cache = (
+            method == "GET"
+            and self.response_cache is not None
+            and self.response_cache.is_cacheable(path)
+        )
+        if use_cache:
+            cached = self.response_cache.get(path, params)
+            if cached is not None:
+                return cached
+
+        self.token_manager.refresh_if_need(path)
+
+        token_info = self.token_info
+        # Encoded once, the same bytes are signed and sent on every attempt.
+        data = self._encode_body(body)
+
+        attempt = 0
+        while True:
+            # Every attempt, retries included, waits for its turn.
+            if self.scheduler is not None and not self.scheduler.acquire(
+                path, self._scheduler_timeout()
+            ):
+                raise requests.exceptions.Timeout("deadline exceeded waiting to send")
+            self._emit("before_request", method, path, params)
+            started = time.monotonic()
+            try:
+                response = self.__send(method, path, params, body, data)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                delay = self._retry_after_error(method, path, attempt, e, started)
+                if delay is None:
+                    raise
+            else:
+                elapsed = time.monotonic() - started
+                delay = self._retry_after_response(
+                    method,
+                    path,
+                    attempt,
+                    response.status_code,
+                    response.content,
+                    data,
+                    elapsed,
+                )
+                if delay is None:
+                    break
+            time.sleep(delay)
+            attempt += 1
+
+        result = self._handle_response(
+            method, path, response.status_code, response.content, data, elapsed
+        )
+        if self._needs_relogin(path, result):
+            self.token_manager.relogin(token_info)
+
+        if use_cache:
+            self.response_cache.set(path, params, result)
+
         return result
 
-    def get(self, path: str, params: dict[str, Any] | None = None) -> dict[str, Any]:
+    def get(
+        self,
+        path: str,
+        params: dict[str, Any] | None = None,
+        timeout: float | None = None,
+    ) -> dict[str, Any]:
         """Http Get.
 
         Requests the server to return specified resources.
@@ -295,13 +767,26 @@ class TuyaOpenAPI:
         Args:
             path (str): api path
             params (map): request parameter
+            timeout (float): optional deadline in seconds for the whole call
 
         Returns:
             response: response body
         """
-        return self.__request("GET", path, params, None)
+        with call_deadline(timeout):
+            if self.single_flight is None:
+                return self.__request("GET", path, params, None)
+            return self.single_flight.do(
+                request_key(path, params),
+                lambda: self.__request("GET", path, params, None),
+                remaining_time(),
+            )
 
-    def post(self, path: str, body: dict[str, Any] | None = None) -> dict[str, Any]:
+    def post(
+        self,
+        path: str,
+        body: dict[str, Any] | None = None,
+        timeout: float | None = None,
+    ) -> dict[str, Any]:
         """Http Post.
 
         Requests the server to update specified resources.
@@ -309,13 +794,20 @@ class TuyaOpenAPI:
         Args:
             path (str): api path
             body (map): request body
+            timeout (float): optional deadline in seconds for the whole call
 
         Returns:
             response: response body
         """
-        return self.__request("POST", path, None, body)
+        with call_deadline(timeout):
+            return self.__request("POST", path, None, body)
 
-    def put(self, path: str, body: dict[str, Any] | None = None) -> dict[str, Any]:
+    def put(
+        self,
+        path: str,
+        body: dict[str, Any] | None = None,
+        timeout: float | None = None,
+    ) -> dict[str, Any]:
         """Http Put.
 
         Requires the server to perform specified operations.
@@ -323,13 +815,20 @@ class TuyaOpenAPI:
         Args:
             path (str): api path
             body (map): request body
+            timeout (float): optional deadline in seconds for the whole call
 
         Returns:
             response: response body
         """
-        return self.__request("PUT", path, None, body)
+        with call_deadline(timeout):
+            return self.__request("PUT", path, None, body)
 
-    def delete(self, path: str, params: dict[str, Any] | None = None) -> dict[str, Any]:
+    def delete(
+        self,
+        path: str,
+        params: dict[str, Any] | None = None,
+        timeout: float | None = None,
+    ) -> dict[str, Any]:
         """Http Delete.
 
         Requires the server to delete specified resources.
@@ -337,8 +836,10 @@ class TuyaOpenAPI:
         Args:
             path (str): api path
             params (map): request param
+            timeout (float): optional deadline in seconds for the whole call
 
         Returns:
             response: response body
         """
-        return self.__request("DELETE", path, params, None)
+        with call_deadline(timeout):
+            return self.__request("DELETE", path, params, None)
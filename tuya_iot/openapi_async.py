@@ -0,0 +1,370 @@
+"""Tuya Open API on asyncio."""
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import Any
+
+try:
+    import aiohttp
+except ImportError:  # pragma: no cover
+    aiohttp = None
+
+from .cache import TuyaResponseCache, request_key
+from .codec import TuyaJSONCodec
+from .metrics import TuyaRequestHook
+from .openapi import (
+    DEFAULT_CONNECT_TIMEOUT,
+    DEFAULT_MAX_RETRIES,
+    DEFAULT_READ_TIMEOUT,
+    DEFAULT_RETRY_BACKOFF,
+    TuyaOpenAPIBase,
+    TuyaTokenInfo,
+    call_deadline,
+    remaining_time,
+)
+from .openlogging import filter_logger, logger
+from .scheduler import TuyaRequestScheduler
+from .singleflight import TuyaAsyncSingleFlight
+from .tuya_enums import AuthType
+
+
+class AsyncTuyaOpenAPI(TuyaOpenAPIBase):
+    """Open Api on asyncio.
+
+    Shares signing, token and retry handling with TuyaOpenAPI through
+    TuyaOpenAPIBase, but every request is awaitable, so many calls can be in
+    flight on one event loop. It is not a TuyaOpenAPI, the managers taking
+    one need its blocking calls.
+
+    Typical usage example:
+
+    openapi = AsyncTuyaOpenAPI(ENDPOINT, ACCESS_ID, ACCESS_KEY)
+    await openapi.connect(USERNAME, PASSWORD)
+    """
+
+    def __init__(
+        self,
+        endpoint: str,
+        access_id: str,
+        access_secret: str,
+        auth_type: AuthType = AuthType.SMART_HOME,
+        lang: str = "en",
+        session: aiohttp.ClientSession | None = None,
+        scheduler: TuyaRequestScheduler | None = None,
+        response_cache: TuyaResponseCache | None = None,
+        coalesce_requests: bool = True,
+        connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+        read_timeout: float = DEFAULT_READ_TIMEOUT,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        retry_backoff: float = DEFAULT_RETRY_BACKOFF,
+        codec: TuyaJSONCodec | None = None,
+        hooks: list[TuyaRequestHook] | None = None,
+    ) -> None:
+        """Init AsyncTuyaOpenAPI.
+
+        Args:
+            session (aiohttp.ClientSession): optional shared session,
+                created on first request if not given
+            scheduler (TuyaRequestScheduler): optional rate limiter
+            response_cache (TuyaResponseCache): optional GET response cache
+            coalesce_requests (bool): share one in-flight GET between
+                concurrent tasks with the same path and params; calls with a
+                deadline wait for one but never start one to share
+            connect_timeout (float): seconds to establish a connection
+            read_timeout (float): seconds to wait for response data
+            max_retries (int): retries of idempotent calls on transient errors
+            retry_backoff (float): base seconds of the jittered backoff
+            codec (TuyaJSONCodec): json codec, the fastest installed if not given
+            hooks (list): TuyaRequestHook instances notified of every request
+        """
+        if aiohttp is None:
+            raise ImportError(
+                "AsyncTuyaOpenAPI requires aiohttp, "
+                "install it with `pip install tuya-iot-py-sdk[async]`"
+            )
+        super().__init__(
+            endpoint,
+            access_id,
+            access_secret,
+            auth_type,
+            lang,
+            scheduler=scheduler,
+            response_cache=response_cache,
+            connect_timeout=connect_timeout,
+            read_timeout=read_timeout,
+            max_retries=max_retries,
+            retry_backoff=retry_backoff,
+            codec=codec,
+            hooks=hooks,
+        )
+
+        self.session = session
+        self.__own_session = session is None
+        self.__refresh_lock: asyncio.Lock | None = None
+        self.single_flight = TuyaAsyncSingleFlight() if coalesce_requests else None
+
+    async def __aenter__(self) -> AsyncTuyaOpenAPI:
+        """Enter async context."""
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        """Exit async context, close the owned session."""
+        await self.close()
+
+    async def close(self) -> None:
+        """Close the http session if it was created by this client."""
+        if self.__own_session and self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def __acquire_token_lock(self) -> asyncio.Lock:
+        # Lock is created lazily so it binds to the running loop.
+        if self.__refresh_lock is None:
+            self.__refresh_lock = asyncio.Lock()
+
+        remaining = remaining_time()
+        await asyncio.wait_for(
+            self.__refresh_lock.acquire(),
+            None if remaining is None else max(remaining, 0),
+        )
+        return self.__refresh_lock
+
+    async def __refresh_access_token_if_need(self, path: str):
+        if not self._need_refresh_token(path):
+            return
+
+        lock = await self.__acquire_token_lock()
+        try:
+            # Another task may have refreshed while we were waiting.
+            if not self._need_refresh_token(path):
+                return
+
+            method, refresh_path = self._refresh_token_request()
+            if method == "POST":
+                response = await self.post(refresh_path)
+            else:
+                response = await self.get(refresh_path)
+            self._handle_refresh_response(response)
+        finally:
+            lock.release()
+
+    async def __relogin(self, stale_token_info: TuyaTokenInfo | None):
+        lock = await self.__acquire_token_lock()
+        try:
+            if self.token_info is not stale_token_info:
+                return
+            self._handle_login_response(await self.post(*self._relogin_request()))
+        finally:
+            lock.release()
+
+    async def connect(
+        self,
+        username: str = "",
+        password: str = "",
+        country_code: str = "",
+        schema: str = "",
+    ) -> dict[str, Any]:
+        """Connect to Tuya Cloud.
+
+        Args:
+            username (str): user name in to C
+            password (str): user password in to C
+            country_code (str): country code in SMART_HOME
+            schema (str): app schema in SMART_HOME
+
+        Returns:
+            response: connect response
+        """
+        response = await self.post(
+            *self._login_request(username, password, country_code, schema)
+        )
+        return self._handle_login_response(response)
+
+    async def __send(
+        self,
+        method: str,
+        path: str,
+        params: dict[str, Any] | None,
+        body: dict[str, Any] | None,
+        data: bytes | None,
+    ) -> tuple[int, bytes]:
+        # Signed per attempt, the signature carries a timestamp.
+        remaining = remaining_time()
+        if remaining is not None and remaining <= 0:
+            raise asyncio.TimeoutError("deadline exceeded")
+        timeout = aiohttp.ClientTimeout(
+            total=remaining, connect=self.connect_timeout, sock_read=self.read_timeout
+        )
+        headers = self._build_headers(method, path, params, data)
+
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                f"Request: method = {method}, \
+                    url = {self.endpoint + path},\
+                    params = {params},\
+                    body = {filter_logger(body)},\
+                    t = {int(time.time()*1000)}"
+            )
+
+        if self.session is None:
+            self.session = aiohttp.ClientSession()
+
+        async with self.session.request(
+            method,
+            self.endpoint + path,
+            params=params,
+            data=data,
+            headers=headers,
+            timeout=timeout,
+        ) as response:
+            return response.status, await response.read()
+
+    async def __request(
+        self,
+        method: str,
+        path: str,
+        params: dict[str, Any] | None = None,
+        body: dict[str, Any] | None = None,
+    ) -> dict[str, Any]:
+
+        use_cache = (
+            method == "GET"
+            and self.response_cache is not None
+            and self.response_cache.is_cacheable(path)
+        )
+        if use_cache:
+            cached = self.response_cache.get(path, params)
+            if cached is not None:
+                return cached
+
+        await self.__refresh_access_token_if_need(path)
+
+        token_info = self.token_info
+        # Encoded once, the same bytes are signed and sent on every attempt.
+        data = self._encode_body(body)
+
+        attempt = 0
+        while True:
+            # Every attempt, retries included, waits for its turn.
+            if self.scheduler is not None and not await self.scheduler.async_acquire(
+                path, self._scheduler_timeout()
+            ):
+                raise asyncio.TimeoutError("deadline exceeded waiting to send")
+            self._emit("before_request", method, path, params)
+            started = time.monotonic()
+            try:
+                (status, content) = await self.__send(method, path, params, body, data)
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                delay = self._retry_after_error(method, path, attempt, e, started)
+                if delay is None:
+                    raise
+            else:
+                elapsed = time.monotonic() - started
+                delay = self._retry_after_response(
+                    method, path, attempt, status, content, data, elapsed
+                )
+                if delay is None:
+                    break
+            await asyncio.sleep(delay)
+            attempt += 1
+
+        result = self._handle_response(method, path, status, content, data, elapsed)
+        if self._needs_relogin(path, result):
+            await self.__relogin(token_info)
+
+        if use_cache:
+            self.response_cache.set(path, params, result)
+
+        return result
+
+    async def get(
+        self,
+        path: str,
+        params: dict[str, Any] | None = None,
+        timeout: float | None = None,
+    ) -> dict[str, Any]:
+        """Http Get.
+
+        Requests the server to return specified resources.
+
+        Args:
+            path (str): api path
+            params (map): request parameter
+            timeout (float): optional deadline in seconds for the whole call
+
+        Returns:
+            response: response body
+        """
+        with call_deadline(timeout):
+            if self.single_flight is None:
+                return await self.__request("GET", path, params, None)
+            return await self.single_flight.do(
+                request_key(path, params),
+                lambda: self.__request("GET", path, params, None),
+                remaining_time(),
+            )
+
+    async def post(
+        self,
+        path: str,
+        body: dict[str, Any] | None = None,
+        timeout: float | None = None,
+    ) -> dict[str, Any]:
+        """Http Post.
+
+        Requests the server to update specified resources.
+
+        Args:
+            path (str): api path
+            body (map): request body
+            timeout (float): optional deadline in seconds for the whole call
+
+        Returns:
+            response: response body
+        """
+        with call_deadline(timeout):
+            return await self.__request("POST", path, None, body)
+
+    async def put(
+        self,
+        path: str,
+        body: dict[str, Any] | None = None,
+        timeout: float | None = None,
+    ) -> dict[str, Any]:
+        """Http Put.
+
+        Requires the server to perform specified operations.
+
+        Args:
+            path (str): api path
+            body (map): request body
+            timeout (float): optional deadline in seconds for the whole call
+
+        Returns:
+            response: response body
+        """
+        with call_deadline(timeout):
+            return await self.__request("PUT", path, None, body)
+
+    async def delete(
+        self,
+        path: str,
+        params: dict[str, Any] | None = None,
+        timeout: float | None = None,
+    ) -> dict[str, Any]:
+        """Http Delete.
+
+        Requires the server to delete specified resources.
+
+        Args:
+            path (str): api path
+            params (map): request param
+            timeout (float): optional deadline in seconds for the whole call
+
+        Returns:
+            response: response body
+        """
+        with call_deadline(timeout):
+            return await self.__request("DELETE", path, params, None)
@@ -1,7 +1,6 @@
 """Tuya iot logging."""
 from __future__ import annotations
 
-import copy
 import logging
 from typing import Any
 
@@ -30,25 +29,37 @@ FILTER_LIST = [
 
 STAR = "***"
 
+_FILTER_KEYS = frozenset(FILTER_LIST)
+
 
 def filter_logger(result_info: dict[str, Any]):
-    """Filter log, hide sensitive info."""
-    if result_info is None:
-        return result_info
-    filter_info_original = copy.deepcopy(result_info)
-    if "result" in filter_info_original:
-        filter_info = filter_info_original["result"]
-    else:
-        filter_info = filter_info_original
-    if isinstance(filter_info, list):
-        for item in filter_info:
-            for filter_key in FILTER_LIST:
-                if filter_key in item:
-                    item[filter_key] = STAR
-
-    elif isinstance(filter_info, dict):
-        for filter_key in FILTER_LIST:
-            if filter_key in filter_info:
-                filter_info[filter_key] = STAR
-
-    return filter_info_original
+    """Filter log, hide sensitive info.
+
+    Sensitive keys are hidden at any depth. The input is never modified, only
+    the dicts and lists on the way to a hidden key are copied.
+    """
+    return _filter(result_info)
+
+
+def _filter(value: Any) -> Any:
+    if isinstance(value, dict):
+        filtered = None
+        for (key, item) in value.items():
+            new_item = STAR if key in _FILTER_KEYS else _filter(item)
+            if new_item is not item:
+                if filtered is None:
+                    filtered = dict(value)
+                filtered[key] = new_item
+        return value if filtered is None else filtered
+
+    if isinstance(value, list):
+        filtered = None
+        for (index, item) in enumerate(value):
+            new_item = _filter(item)
+            if new_item is not item:
+                if filtered is None:
+                    filtered = list(value)
+                filtered[index] = new_item
+        return value if filtered is None else filtered
+
+    return value
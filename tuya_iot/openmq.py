@@ -2,11 +2,11 @@
 from __future__ import annotations
 
 import base64
-import json
+import logging
 import threading
 import time
 import uuid
-from typing import Any, Callable
+from typing import Any, Callable, Iterable
 from urllib.parse import urlsplit
 from typing import Optional
 
@@ -14,14 +14,23 @@ from Crypto.Cipher import AES
 from paho.mqtt import client as mqtt
 from requests.exceptions import RequestException
 
+from .dispatcher import TuyaMQDispatcher
 from .openapi import TO_C_SMART_HOME_REFRESH_TOKEN_API, TuyaOpenAPI
 from .openlogging import logger
+from .subscriptions import TuyaSubscriptions
 from .tuya_enums import AuthType
 
 LINK_ID = f"tuya-iot-app-sdk-python.{uuid.uuid1()}"
 GCM_TAG_LENGTH = 16
 CONNECT_FAILED_NOT_AUTHORISED = 5
 
+# Seconds before the mq config expires that a new client takes over.
+ROTATE_BEFORE_EXPIRE = 60
+# Seconds the new client has to connect and subscribe before rotation fails.
+SUBSCRIBE_TIMEOUT = 10
+# Seconds after the old client closed that both clients' copies may still come.
+DUPLICATE_WINDOW = 30
+
 TO_C_CUSTOM_MQTT_CONFIG_API = "/v1.0/iot-03/open-hub/access-config"
 TO_C_SMART_HOME_MQTT_CONFIG_API = "/v1.0/open-hub/access/config"
 
@@ -39,6 +48,19 @@ class TuyaMQConfig:
         self.source_topic = result.get("source_topic", {})
         self.sink_topic = result.get("sink_topic", {})
         self.expire_time = result.get("expire_time", 0)
+        # Every message body of this config is encrypted with the same key.
+        self.key = self.password[8:24].encode("utf8")
+        self.__ecb_cipher = None
+
+    def ecb_cipher(self):
+        """AES-ECB cipher of SMART_HOME message bodies.
+
+        Created once and shared: ECB keeps no state between calls, so one
+        cipher decrypts every message, from any thread.
+        """
+        if self.__ecb_cipher is None:
+            self.__ecb_cipher = AES.new(self.key, AES.MODE_ECB)
+        return self.__ecb_cipher
 
 
 class TuyaOpenMQ(threading.Thread):
@@ -48,16 +70,37 @@ class TuyaOpenMQ(threading.Thread):
 
     Attributes:
       openapi: tuya openapi
+      dispatcher: hands received frames from the network thread to workers
+      duplicates: messages dropped as received by both clients of a rotation
+      disconnected_at: when the mqtt link was lost, None while connected
     """
 
-    def __init__(self, api: TuyaOpenAPI) -> None:
-        """Init TuyaOpenMQ."""
+    def __init__(
+        self, api: TuyaOpenAPI, dispatcher: TuyaMQDispatcher | None = None
+    ) -> None:
+        """Init TuyaOpenMQ.
+
+        Args:
+            dispatcher (TuyaMQDispatcher): message dispatch stage, one ordered
+                worker if not given
+        """
         threading.Thread.__init__(self)
         self.api: TuyaOpenAPI = api
+        self.dispatcher = dispatcher if dispatcher is not None else TuyaMQDispatcher()
         self._stop_event = threading.Event()
         self.client = None
         self.mq_config = None
         self.message_listeners = set()
+        # Listeners added with filters, looked up by the message's values.
+        self.message_subscriptions = TuyaSubscriptions()
+        self.reconnect_listeners = set()
+        self.duplicates = 0
+        self.disconnected_at: float | None = None
+        # Set by stop and by rejected credentials, to end the wait in run.
+        self._wakeup = threading.Event()
+        self.__seen: set[tuple[Any, Any, int]] = set()
+        self.__dedup_until = 0.0
+        self.__dedup_lock = threading.Lock()
 
     def _get_mqtt_config(self) -> Optional[TuyaMQConfig]:
         response = self.api.post(
@@ -80,116 +123,251 @@ class TuyaOpenMQ(threading.Thread):
 
         return TuyaMQConfig(response)
 
-    def _decode_mq_message(self, b64msg: str, password: str, t: str) -> dict[str, Any]:
-        key = password[8:24]
+    def _decode_mq_message(
+        self, b64msg: str, mq_config: TuyaMQConfig, t: str
+    ) -> dict[str, Any]:
+        buffer = base64.b64decode(b64msg)
 
         if self.api.auth_type == AuthType.SMART_HOME:
-            cipher = AES.new(key.encode("utf8"), AES.MODE_ECB)
-            msg = cipher.decrypt(base64.b64decode(b64msg))
+            msg = mq_config.ecb_cipher().decrypt(buffer)
             padding_bytes = msg[-1]
-            msg = msg[:-padding_bytes]
-            return json.loads(msg)
+            return self.api.codec.loads(msg[:-padding_bytes])
         else:
-            # base64 decode
-            buffer = base64.b64decode(b64msg)
-
-            # get iv buffer
-            iv_length = int.from_bytes(buffer[0:4], byteorder="big")
-            iv_buffer = buffer[4: iv_length + 4]
-
-            # get data buffer
-            data_buffer = buffer[iv_length + 4: len(buffer) - GCM_TAG_LENGTH]
-
-            # aad
-            aad_buffer = str(t).encode("utf8")
-
-            # tag
-            tag_buffer = buffer[len(buffer) - GCM_TAG_LENGTH:]
-
-            cipher = AES.new(key.encode("utf8"), AES.MODE_GCM, nonce=iv_buffer)
-            cipher.update(aad_buffer)
-            plaintext = cipher.decrypt_and_verify(data_buffer, tag_buffer).decode(
-                "utf8"
-            )
-            return json.loads(plaintext)
+            # iv length, iv, data and tag, sliced without copying
+            view = memoryview(buffer)
+            iv_length = int.from_bytes(view[0:4], byteorder="big")
+            iv_buffer = view[4: iv_length + 4]
+            data_buffer = view[iv_length + 4: len(view) - GCM_TAG_LENGTH]
+            tag_buffer = view[len(view) - GCM_TAG_LENGTH:]
+
+            # A gcm cipher is single use, only its key is reused.
+            cipher = AES.new(mq_config.key, AES.MODE_GCM, nonce=iv_buffer)
+            cipher.update(str(t).encode("utf8"))
+            plaintext = cipher.decrypt_and_verify(data_buffer, tag_buffer)
+            return self.api.codec.loads(plaintext)
 
     def _on_disconnect(self, client, userdata, rc):
         if rc != 0:
             logger.error(f"Unexpected disconnection.{rc}")
+            if client is self.client and self.disconnected_at is None:
+                self.disconnected_at = time.time()
         else:
             logger.debug("disconnect")
 
     def _on_connect(self, mqttc: mqtt.Client, user_data: Any, flags, rc):
         logger.debug(f"connect flags->{flags}, rc->{rc}")
         if rc == 0:
-            for (key, value) in self.mq_config.source_topic.items():
-                mqttc.subscribe(value)
-        elif rc == CONNECT_FAILED_NOT_AUTHORISED:
-            self.__run_mqtt()
+            for (key, value) in user_data["mqConfig"].source_topic.items():
+                (_, mid) = mqttc.subscribe(value)
+                user_data["pending"].add(mid)
+        elif rc == CONNECT_FAILED_NOT_AUTHORISED and mqttc is self.client:
+            # Credentials rejected, rotate now instead of at expiry.
+            self._wakeup.set()
 
     def _on_message(self, mqttc: mqtt.Client, user_data: Any, msg: mqtt.MQTTMessage):
-        logger.debug(f"payload-> {msg.payload}")
+        # Runs on the network thread, decoding happens on the workers.
+        frame = (msg.payload, user_data["mqConfig"])
+        if self.dispatcher.running:
+            self.dispatcher.submit(frame)
+        else:
+            self._handle_frame(frame)
 
-        msg_dict = json.loads(msg.payload.decode("utf8"))
+    def _handle_frame(self, frame: tuple[bytes, TuyaMQConfig]):
+        msg_dict = self._decode_frame(frame)
+        if msg_dict is None:
+            return
+
+        if self.dispatcher.is_deferred(msg_dict):
+            self.dispatcher.defer(self._notify, msg_dict)
+        else:
+            self._notify(msg_dict)
+
+    def _decode_frame(
+        self, frame: tuple[bytes, TuyaMQConfig]
+    ) -> dict[str, Any] | None:
+        (payload, mq_config) = frame
+        debug = logger.isEnabledFor(logging.DEBUG)
+        if debug:
+            logger.debug(f"payload-> {payload}")
+
+        msg_dict = self.api.codec.loads(payload)
 
         t = msg_dict.get("t", "")
 
-        mq_config = user_data["mqConfig"]
-        decrypted_data = self._decode_mq_message(
-            msg_dict["data"], mq_config.password, t
-        )
+        decrypted_data = self._decode_mq_message(msg_dict["data"], mq_config, t)
         if decrypted_data is None:
-            return
+            return None
 
         msg_dict["data"] = decrypted_data
-        logger.debug(f"on_message: {msg_dict}")
+        if debug:
+            logger.debug(f"on_message: {msg_dict}")
+        if self._is_duplicate(msg_dict):
+            return None
+        return msg_dict
 
-        for listener in self.message_listeners:
+    def _is_duplicate(self, msg_dict: dict[str, Any]) -> bool:
+        """Whether msg_dict was already received by the other rotation client.
+
+        Only checked while two clients overlap, messages are keyed by devId,
+        t and a hash of their decrypted data, as each client's copy is
+        encrypted with its own key.
+        """
+        if time.monotonic() >= self.__dedup_until:
+            if self.__seen:
+                with self.__dedup_lock:
+                    self.__seen.clear()
+            return False
+
+        data = msg_dict.get("data")
+        device_id = data.get("devId") if isinstance(data, dict) else None
+        key = (device_id, msg_dict.get("t"), hash(self.api.codec.dumps(data)))
+        with self.__dedup_lock:
+            if key in self.__seen:
+                self.duplicates += 1
+                return True
+            self.__seen.add(key)
+        return False
+
+    def _decode_frames(
+        self, frames: list[tuple[bytes, TuyaMQConfig]]
+    ) -> list[dict[str, Any] | None]:
+        """Decode a batch of frames, None for each frame that fails."""
+        msgs = []
+        for frame in frames:
+            try:
+                msgs.append(self._decode_frame(frame))
+            except Exception as e:
+                logger.exception(f"mq decode failed: {e}")
+                msgs.append(None)
+        return msgs
+
+    def _notify(self, msg_dict: dict[str, Any]):
+        # Copied, listeners may be added from other threads meanwhile.
+        for listener in tuple(self.message_listeners):
+            listener(msg_dict)
+
+        if not self.message_subscriptions:
+            return
+        data = msg_dict.get("data")
+        if not isinstance(data, dict):
+            data = {}
+        for listener in self.message_subscriptions.match(
+            protocol=msg_dict.get("protocol"),
+            device_id=data.get("devId"),
+            biz_code=data.get("bizCode"),
+        ):
             listener(msg_dict)
 
     def _on_subscribe(self, mqttc: mqtt.Client, user_data: Any, mid, granted_qos):
         logger.debug(f"_on_subscribe: {mid}")
+        user_data["pending"].discard(mid)
+        if not user_data["pending"]:
+            user_data["subscribed"].set()
+            if self.disconnected_at is not None:
+                self.__on_reconnect()
+
+    def __on_reconnect(self):
+        (gap_start, self.disconnected_at) = (self.disconnected_at, None)
+        gap_end = time.time()
+        logger.debug(f"mqtt reconnected after {gap_end - gap_start:.1f}s")
+        # Listeners may call the cloud, keep them off the network thread.
+        for listener in tuple(self.reconnect_listeners):
+            self.dispatcher.defer(listener, gap_start, gap_end)
 
     def _on_log(self, mqttc: mqtt.Client, user_data: Any, level, string):
-        logger.debug(f"_on_log: {string}")
+        logger.debug("_on_log: %s", string)
 
     def run(self):
         """Method representing the thread's activity which should not be used directly."""
         backoff_seconds = 1
         while not self._stop_event.is_set():
+            self._wakeup.clear()
             try:
-                self.__run_mqtt()
-                backoff_seconds = 1
-
-                # reconnect every 2 hours required.
-                time.sleep(self.mq_config.expire_time - 60)
-            except RequestException as e:
+                rotated = self.__run_mqtt()
+            except (RequestException, OSError) as e:
                 logger.exception(e)
-                logger.error(f"failed to refresh mqtt server, retrying in {backoff_seconds} seconds.")
-
-                time.sleep(backoff_seconds)
-                backoff_seconds = min(backoff_seconds * 2 , 60) # Try at most every 60 seconds to refresh
+                rotated = False
 
-
-    def __run_mqtt(self):
+            if self._stop_event.is_set():
+                break
+            if rotated:
+                backoff_seconds = 1
+                # reconnect every 2 hours required, a bit before expiry.
+                wait_seconds = max(
+                    self.mq_config.expire_time - ROTATE_BEFORE_EXPIRE, 1
+                )
+            else:
+                logger.error(
+                    "failed to refresh mqtt server, "
+                    f"retrying in {backoff_seconds} seconds."
+                )
+                wait_seconds = backoff_seconds
+                # Try at most every 60 seconds to refresh
+                backoff_seconds = min(backoff_seconds * 2, 60)
+            self._wakeup.wait(wait_seconds)
+
+    def __run_mqtt(self) -> bool:
+        """Replace the mqtt client, make before break.
+
+        The new client connects and subscribes while the old one still
+        receives, only then is the old one closed. Messages both receive
+        meanwhile are delivered once, see _is_duplicate.
+
+        Returns:
+            True if the new client took over
+        """
         mq_config = self._get_mqtt_config()
         if mq_config is None:
             logger.error("error while get mqtt config")
-            return
+            return False
 
-        self.mq_config = mq_config
+        old_client = self.client
+        if old_client is not None:
+            with self.__dedup_lock:
+                self.__dedup_until = float("inf")
 
         logger.debug(f"connecting {mq_config.url}")
-        mqttc = self._start(mq_config)
+        subscribed = threading.Event()
+        mqttc = self._start(mq_config, subscribed)
+        if not subscribed.wait(SUBSCRIBE_TIMEOUT) or self._stop_event.is_set():
+            logger.error(f"mqtt client not subscribed in {SUBSCRIBE_TIMEOUT}s")
+            self._close(mqttc)
+            if old_client is not None:
+                self.__close_dedup_window()
+            return False
 
-        if self.client:
-            self.client.disconnect()
+        self.mq_config = mq_config
         self.client = mqttc
-
-    def _start(self, mq_config: TuyaMQConfig) -> mqtt.Client:
+        if old_client is not None:
+            # Messages it already received are queued, nothing is lost.
+            self._close(old_client)
+            self.__close_dedup_window()
+        if self._stop_event.is_set():
+            # Stopped while rotating, stop may have closed the old client only.
+            self._close(mqttc)
+        return True
+
+    def __close_dedup_window(self):
+        with self.__dedup_lock:
+            self.__dedup_until = time.monotonic() + DUPLICATE_WINDOW
+
+    @staticmethod
+    def _close(mqttc: mqtt.Client):
+        mqttc.disconnect()
+        mqttc.loop_stop()
+
+    def _start(
+        self, mq_config: TuyaMQConfig, subscribed: threading.Event | None = None
+    ) -> mqtt.Client:
         mqttc = mqtt.Client(mq_config.client_id)
         mqttc.username_pw_set(mq_config.username, mq_config.password)
-        mqttc.user_data_set({"mqConfig": mq_config})
+        mqttc.user_data_set(
+            {
+                "mqConfig": mq_config,
+                "pending": set(),
+                "subscribed": subscribed or threading.Event(),
+            }
+        )
         mqttc.on_connect = self._on_connect
         mqttc.on_message = self._on_message
         mqttc.on_subscribe = self._on_subscribe
@@ -211,6 +389,7 @@ class TuyaOpenMQ(threading.Thread):
         Start mqtt thread
         """
         logger.debug("start")
+        self.dispatcher.start(self._decode_frames, self._notify)
         super().start()
 
     def stop(self):
@@ -220,14 +399,53 @@ class TuyaOpenMQ(threading.Thread):
         """
         logger.debug("stop")
         self.message_listeners = set()
-        self.client.disconnect()
-        self.client = None
+        self.message_subscriptions = TuyaSubscriptions()
+        self.reconnect_listeners = set()
         self._stop_event.set()
-
-    def add_message_listener(self, listener: Callable[[str], None]):
-        """Add mqtt message listener."""
-        self.message_listeners.add(listener)
+        self._wakeup.set()
+        if self.client is not None:
+            self._close(self.client)
+            self.client = None
+        self.dispatcher.stop()
+
+    def add_message_listener(
+        self,
+        listener: Callable[[str], None],
+        protocol: int | Iterable[int] | None = None,
+        device_id: str | Iterable[str] | None = None,
+        biz_code: str | Iterable[str] | None = None,
+    ):
+        """Add mqtt message listener.
+
+        Without filters the listener gets every message. With filters it
+        only gets the messages matching all of them, and is found through an
+        index instead of being called for every message.
+
+        Args:
+            protocol: message protocol or protocols, e.g. 4 for reports
+            device_id: devId or devIds
+            biz_code: bizCode or bizCodes of protocol 20 events
+        """
+        if protocol is None and device_id is None and biz_code is None:
+            self.message_listeners.add(listener)
+        else:
+            self.message_subscriptions.add(
+                listener, protocol=protocol, device_id=device_id, biz_code=biz_code
+            )
 
     def remove_message_listener(self, listener: Callable[[str], None]):
         """Remvoe mqtt message listener."""
         self.message_listeners.discard(listener)
+        self.message_subscriptions.remove(listener)
+
+    def add_reconnect_listener(self, listener: Callable[[float, float], None]):
+        """Add mqtt reconnect listener.
+
+        Called with the start and end time of the gap, messages sent in
+        between were lost.
+        """
+        self.reconnect_listeners.add(listener)
+
+    def remove_reconnect_listener(self, listener: Callable[[float, float], None]):
+        """Remove mqtt reconnect listener."""
+        self.reconnect_listeners.discard(listener)
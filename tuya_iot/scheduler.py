@@ -0,0 +1,135 @@
+"""Tuya open api request scheduler."""
+from __future__ import annotations
+
+import asyncio
+import re
+import threading
+import time
+
+# (path pattern, requests per second, burst)
+DEFAULT_RATE_LIMITS = [
+    (r"/devices/[^/]+/commands$", 20, 20),
+    (r"/devices/(?:[^/]+/)?status$|/devices/?$", 10, 10),
+    (r"/devices/[^/]+/specifications?$|/functions(?:/[^/]+)?$", 10, 10),
+    (r"/assets/", 10, 10),
+]
+
+
+class TuyaTokenBucket:
+    """Token bucket.
+
+    Callers reserve a token and are told how long to wait for it, so excess
+    calls queue up in arrival order instead of being sent at once.
+
+    Attributes:
+        rate: tokens added per second
+        capacity: max tokens, the allowed burst
+    """
+
+    def __init__(self, rate: float, capacity: float | None = None) -> None:
+        """Init TuyaTokenBucket."""
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+        self.__tokens = self.capacity
+        self.__updated_at = time.monotonic()
+        self.__lock = threading.Lock()
+
+    def reserve(self, max_wait: float | None = None) -> float | None:
+        """Take one token.
+
+        Args:
+            max_wait (float): longest acceptable wait, no token is taken if
+                it would be longer
+
+        Returns:
+            seconds to wait before the token may be used, None if over max_wait
+        """
+        with self.__lock:
+            now = time.monotonic()
+            self.__tokens = min(
+                self.capacity, self.__tokens + (now - self.__updated_at) * self.rate
+            )
+            self.__updated_at = now
+            wait = max(1 - self.__tokens, 0) / self.rate
+            if max_wait is not None and wait > max_wait:
+                return None
+            self.__tokens -= 1
+            return wait
+
+
+class TuyaRequestScheduler:
+    """Tuya request scheduler.
+
+    Applies a token bucket per path pattern, the first matching rule wins.
+    Paths that match no rule are sent immediately, unless default_rate is set.
+
+    Typical usage example:
+
+    scheduler = TuyaRequestScheduler([(r"/commands$", 5, 10)])
+    openapi = TuyaOpenAPI(ENDPOINT, ACCESS_ID, ACCESS_KEY, scheduler=scheduler)
+    """
+
+    def __init__(
+        self,
+        rules: list[tuple[str, float, int]] | None = None,
+        default_rate: float | None = None,
+        default_burst: int | None = None,
+    ) -> None:
+        """Init TuyaRequestScheduler.
+
+        Args:
+            rules (list): (path pattern, requests per second, burst) tuples,
+                DEFAULT_RATE_LIMITS if not given
+            default_rate (float): rate for paths matching no rule
+            default_burst (int): burst for paths matching no rule
+        """
+        self.rules = [
+            (re.compile(pattern), TuyaTokenBucket(rate, burst))
+            for (pattern, rate, burst) in (
+                DEFAULT_RATE_LIMITS if rules is None else rules
+            )
+        ]
+        self.default_bucket = (
+            TuyaTokenBucket(default_rate, default_burst)
+            if default_rate is not None
+            else None
+        )
+
+    def _bucket(self, path: str) -> TuyaTokenBucket | None:
+        for (pattern, bucket) in self.rules:
+            if pattern.search(path):
+                return bucket
+        return self.default_bucket
+
+    def acquire(self, path: str, timeout: float | None = None) -> bool:
+        """Block until a request to path may be sent.
+
+        Returns:
+            False, at once and without taking a token, if the wait would be
+            longer than timeout
+        """
+        bucket = self._bucket(path)
+        if bucket is None:
+            return True
+        wait = bucket.reserve(timeout)
+        if wait is None:
+            return False
+        if wait > 0:
+            time.sleep(wait)
+        return True
+
+    async def async_acquire(self, path: str, timeout: float | None = None) -> bool:
+        """Wait until a request to path may be sent, without blocking the loop.
+
+        Returns:
+            False, see acquire
+        """
+        bucket = self._bucket(path)
+        if bucket is None:
+            return True
+        wait = bucket.reserve(timeout)
+        if wait is None:
+            return False
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return True
@@ -0,0 +1,120 @@
+"""Tuya request coalescing."""
+from __future__ import annotations
+
+import asyncio
+import copy
+import threading
+from typing import Any, Awaitable, Callable, Hashable
+
+
+class _Call:
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException | None = None
+        self.followers = 0
+
+
+class TuyaSingleFlight:
+    """Single-flight for threads.
+
+    Concurrent calls with the same key share one execution. The first caller
+    runs the function, the others wait for it and get the same exception, or
+    a deep copy of its result. When others waited, the first caller gets a
+    copy as well, so no caller sees another one change its result.
+
+    A caller with a timeout may wait for an in-flight call, but runs func
+    alone when none is in flight: the call would run under its deadline,
+    which must not fail callers without one.
+    """
+
+    def __init__(self, timeout_error: type[Exception] = TimeoutError) -> None:
+        """Init TuyaSingleFlight.
+
+        Args:
+            timeout_error: raised when a waiting caller times out
+        """
+        self.timeout_error = timeout_error
+        self.__calls: dict[Hashable, _Call] = {}
+        self.__lock = threading.Lock()
+
+    def do(
+        self, key: Hashable, func: Callable[[], Any], timeout: float | None = None
+    ) -> Any:
+        """Run func, or wait up to timeout for the in-flight call with the same key."""
+        with self.__lock:
+            call = self.__calls.get(key)
+            leader = call is None
+            if not leader:
+                call.followers += 1
+            elif timeout is None:
+                call = self.__calls[key] = _Call()
+
+        if call is None:
+            return func()
+
+        if not leader:
+            if not call.done.wait(None if timeout is None else max(timeout, 0)):
+                raise self.timeout_error("timeout waiting for in-flight call")
+            if call.error is not None:
+                raise call.error
+            return copy.deepcopy(call.result)
+
+        try:
+            call.result = func()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self.__lock:
+                del self.__calls[key]
+                followers = call.followers
+            call.done.set()
+        # The result is only shared once someone else waited for it.
+        return copy.deepcopy(call.result) if followers else call.result
+
+
+class TuyaAsyncSingleFlight:
+    """Single-flight for asyncio tasks, see TuyaSingleFlight."""
+
+    def __init__(self) -> None:
+        """Init TuyaAsyncSingleFlight."""
+        self.__calls: dict[Hashable, asyncio.Future] = {}
+        self.__followers: dict[Hashable, int] = {}
+
+    async def do(
+        self,
+        key: Hashable,
+        func: Callable[[], Awaitable[Any]],
+        timeout: float | None = None,
+    ) -> Any:
+        """Await func, or up to timeout the in-flight call with the same key."""
+        future = self.__calls.get(key)
+        if future is not None:
+            self.__followers[key] += 1
+            # shield, a cancelled follower must not cancel the leader.
+            return copy.deepcopy(
+                await asyncio.wait_for(
+                    asyncio.shield(future),
+                    None if timeout is None else max(timeout, 0),
+                )
+            )
+
+        if timeout is not None:
+            return await func()
+
+        future = asyncio.get_running_loop().create_future()
+        self.__calls[key] = future
+        self.__followers[key] = 0
+        try:
+            result = await func()
+            future.set_result(result)
+        except BaseException as e:
+            future.set_exception(e)
+            # Retrieve it so an unawaited future does not log a warning.
+            future.exception()
+            raise
+        finally:
+            del self.__calls[key]
+            followers = self.__followers.pop(key)
+        return copy.deepcopy(result) if followers else result
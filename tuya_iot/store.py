@@ -0,0 +1,152 @@
+"""Tuya device persistent store."""
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any
+
+from .openlogging import logger
+
+STORE_FILE_NAME = "tuya_iot.sqlite3"
+
+SPECIFICATION_TTL = 7 * 24 * 60 * 60
+DEVICE_TTL = 24 * 60 * 60
+
+
+class TuyaDeviceStore:
+    """Tuya device store.
+
+    Keeps device specifications per product and the last known device map
+    in a SQLite file, so a restarted TuyaDeviceManager has a usable device
+    map before any network call. Entries older than their TTL are still
+    loaded but reported as stale, to be revalidated from the cloud.
+
+    Typical usage example:
+
+    store = TuyaDeviceStore("/var/lib/tuya")
+    device_manager = TuyaDeviceManager(openapi, openmq, store)
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        specification_ttl: int = SPECIFICATION_TTL,
+        device_ttl: int = DEVICE_TTL,
+    ) -> None:
+        """Init TuyaDeviceStore.
+
+        Args:
+            directory (str): directory of the store file, created if missing
+            specification_ttl (int): seconds a stored specification is fresh
+            device_ttl (int): seconds a stored device is fresh
+        """
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, STORE_FILE_NAME)
+        self.specification_ttl = specification_ttl
+        self.device_ttl = device_ttl
+
+        self.__lock = threading.Lock()
+        self.__conn = sqlite3.connect(self.path, check_same_thread=False)
+        with self.__conn:
+            self.__conn.execute(
+                "CREATE TABLE IF NOT EXISTS specification ("
+                "product_id TEXT, category TEXT, data TEXT, updated_at REAL, "
+                "PRIMARY KEY (product_id, category))"
+            )
+            self.__conn.execute(
+                "CREATE TABLE IF NOT EXISTS device ("
+                "id TEXT PRIMARY KEY, data TEXT, updated_at REAL)"
+            )
+
+    def close(self):
+        """Close the store file."""
+        with self.__lock:
+            self.__conn.close()
+
+    def load_specifications(
+        self,
+    ) -> dict[tuple[str, str], tuple[dict[str, Any], bool]]:
+        """Load stored specifications.
+
+        Returns:
+            (product_id, category) -> (specification, is fresh)
+        """
+        now = time.time()
+        with self.__lock:
+            rows = self.__conn.execute(
+                "SELECT product_id, category, data, updated_at FROM specification"
+            ).fetchall()
+
+        specifications = {}
+        for (product_id, category, data, updated_at) in rows:
+            try:
+                specification = json.loads(data)
+            except ValueError:
+                logger.warning(f"broken specification in store: {product_id}")
+                continue
+            specifications[(product_id, category)] = (
+                specification,
+                now - updated_at < self.specification_ttl,
+            )
+        return specifications
+
+    def save_specifications(
+        self, specifications: dict[tuple[str, str], dict[str, Any]]
+    ):
+        """Store specifications keyed by (product_id, category)."""
+        now = time.time()
+        with self.__lock, self.__conn:
+            self.__conn.executemany(
+                "INSERT OR REPLACE INTO specification VALUES (?, ?, ?, ?)",
+                [
+                    (product_id, category, json.dumps(specification), now)
+                    for ((product_id, category), specification) in (
+                        specifications.items()
+                    )
+                ],
+            )
+
+    def load_devices(self) -> dict[str, tuple[dict[str, Any], bool]]:
+        """Load stored devices.
+
+        Returns:
+            device id -> (device attributes, is fresh)
+        """
+        now = time.time()
+        with self.__lock:
+            rows = self.__conn.execute(
+                "SELECT id, data, updated_at FROM device"
+            ).fetchall()
+
+        devices = {}
+        for (device_id, data, updated_at) in rows:
+            try:
+                device = json.loads(data)
+            except ValueError:
+                logger.warning(f"broken device in store: {device_id}")
+                continue
+            devices[device_id] = (device, now - updated_at < self.device_ttl)
+        return devices
+
+    def save_devices(self, devices: dict[str, dict[str, Any]]):
+        """Store device attributes keyed by device id."""
+        now = time.time()
+        with self.__lock, self.__conn:
+            self.__conn.executemany(
+                "INSERT OR REPLACE INTO device VALUES (?, ?, ?)",
+                [
+                    (device_id, json.dumps(device), now)
+                    for (device_id, device) in devices.items()
+                ],
+            )
+
+    def remove_devices(self, device_ids: list[str]):
+        """Remove stored devices."""
+        with self.__lock, self.__conn:
+            self.__conn.executemany(
+                "DELETE FROM device WHERE id = ?",
+                [(device_id,) for device_id in device_ids],
+            )
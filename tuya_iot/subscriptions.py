@@ -0,0 +1,145 @@
+"""Tuya listener subscriptions."""
+from __future__ import annotations
+
+import threading
+from typing import Any, Hashable, Iterable
+
+# Filters a subscription is indexed under, the first one it has wins.
+DEFAULT_INDEX_ORDER = ("device_id", "biz_code", "code", "category", "protocol")
+
+
+def _values(value: Any) -> frozenset:
+    if isinstance(value, (str, bytes, int)):
+        return frozenset([value])
+    return frozenset(value)
+
+
+class _Subscription:
+    def __init__(
+        self, listener: Any, filters: dict[str, frozenset], index_name: str
+    ) -> None:
+        self.listener = listener
+        self.filters = filters
+        self.index_name = index_name
+        self.keys = [(index_name, value) for value in filters[index_name]]
+
+
+class TuyaSubscriptions:
+    """Listeners indexed by the values they filter on.
+
+    Listeners must be hashable, like those kept in the listener sets.
+
+    A subscription matches when every one of its filters matches, and is
+    indexed under a single filter, so match only looks at the subscriptions
+    filed under the values at hand instead of at every listener.
+    """
+
+    def __init__(self, index_order: tuple[str, ...] = DEFAULT_INDEX_ORDER) -> None:
+        """Init TuyaSubscriptions.
+
+        Args:
+            index_order (tuple): filter names, the first one a subscription
+                has is the one it is indexed under
+        """
+        self.index_order = index_order
+        self.__index: dict[tuple[str, Hashable], list[_Subscription]] = {}
+        # Subscriptions by the filter they are indexed under, for match to
+        # find those it is told to ignore the filter of.
+        self.__by_index_name: dict[str, dict[int, _Subscription]] = {}
+        # Keyed by the listener itself, bound methods are equal but not the
+        # same object each time.
+        self.__subscriptions: dict[Any, list[_Subscription]] = {}
+        self.__count = 0
+        self.__lock = threading.Lock()
+
+    def __len__(self) -> int:
+        """Number of subscriptions."""
+        return self.__count
+
+    def add(self, listener: Any, **filters: Any):
+        """Subscribe listener.
+
+        Args:
+            filters: filter name to a value or an iterable of values, the
+                subscription matches if any of them does; None filters are
+                ignored, at least one must be left
+        """
+        filters = {
+            name: _values(value)
+            for (name, value) in filters.items()
+            if value is not None
+        }
+        name = next((name for name in self.index_order if name in filters), None)
+        if name is None:
+            raise ValueError(f"subscription needs one of {self.index_order}")
+
+        subscription = _Subscription(listener, filters, name)
+        with self.__lock:
+            self.__subscriptions.setdefault(listener, []).append(subscription)
+            for key in subscription.keys:
+                self.__index.setdefault(key, []).append(subscription)
+            self.__by_index_name.setdefault(name, {})[id(subscription)] = subscription
+            self.__count += 1
+
+    def remove(self, listener: Any) -> bool:
+        """Remove every subscription of listener.
+
+        Returns:
+            False if listener had none
+        """
+        with self.__lock:
+            subscriptions = self.__subscriptions.pop(listener, None)
+            if not subscriptions:
+                return False
+            self.__count -= len(subscriptions)
+            for subscription in subscriptions:
+                self.__by_index_name[subscription.index_name].pop(
+                    id(subscription), None
+                )
+                for key in subscription.keys:
+                    left = [
+                        item
+                        for item in self.__index.get(key, ())
+                        if item is not subscription
+                    ]
+                    if left:
+                        self.__index[key] = left
+                    else:
+                        self.__index.pop(key, None)
+        return True
+
+    def match(self, ignore: Iterable[str] = (), **values: Any) -> list[Any]:
+        """Listeners subscribed to these values.
+
+        Args:
+            ignore: filter names that match whatever their value
+            values: filter name to a value or an iterable of values; filters
+                without a value here never match
+        """
+        ignore = frozenset(ignore)
+        values = {
+            name: _values(value)
+            for (name, value) in values.items()
+            if value is not None and name not in ignore
+        }
+        candidates: dict[int, _Subscription] = {}
+        with self.__lock:
+            for (name, name_values) in values.items():
+                for value in name_values:
+                    for subscription in self.__index.get((name, value), ()):
+                        candidates[id(subscription)] = subscription
+            for name in ignore:
+                candidates.update(self.__by_index_name.get(name, {}))
+
+        listeners = {}
+        for subscription in candidates.values():
+            if subscription.listener in listeners:
+                continue
+            if all(
+                name in ignore
+                or (name in values and not accepted.isdisjoint(values[name]))
+                for (name, accepted) in subscription.filters.items()
+            ):
+                listeners[subscription.listener] = None
+        return list(listeners)
+
@@ -0,0 +1,206 @@
+"""Tuya open api http transports."""
+from __future__ import annotations
+
+import json
+from abc import ABCMeta, abstractmethod
+from typing import Any
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover
+    httpx = None
+
+DEFAULT_POOL_CONNECTIONS = 10
+DEFAULT_POOL_MAXSIZE = 32
+DEFAULT_KEEPALIVE_EXPIRY = 60
+
+
+class TuyaResponse:
+    """Http response returned by transports.
+
+    Attributes:
+        status_code: http status code
+        content: response body
+    """
+
+    def __init__(self, status_code: int, content: bytes) -> None:
+        """Init TuyaResponse."""
+        self.status_code = status_code
+        self.content = content
+
+    @property
+    def ok(self) -> bool:
+        """Whether the status code is below 400."""
+        return self.status_code < 400
+
+    @property
+    def text(self) -> str:
+        """Response body as text."""
+        return self.content.decode("utf8", errors="replace")
+
+    def json(self) -> Any:
+        """Response body decoded from json."""
+        return json.loads(self.content)
+
+
+class TuyaTransport(metaclass=ABCMeta):
+    """Http transport used by TuyaOpenAPI.
+
+    Implementations must be thread-safe, and raise requests' ConnectionError
+    and Timeout for transient failures so retries work the same everywhere.
+    """
+
+    @abstractmethod
+    def request(
+        self,
+        method: str,
+        url: str,
+        params: dict[str, Any] | None = None,
+        data: bytes | None = None,
+        headers: dict[str, str] | None = None,
+        timeout: tuple[float, float] | None = None,
+    ) -> TuyaResponse:
+        """Send a request.
+
+        Args:
+            method (str): http method
+            url (str): full url
+            params (map): query parameters
+            data (bytes): encoded request body, sent as is
+            headers (map): request headers
+            timeout (tuple): (connect, read) timeouts in seconds
+
+        Returns:
+            response, anything with status_code, ok, text, content and json()
+        """
+
+    def close(self):
+        """Release pooled connections."""
+
+
+class RequestsTransport(TuyaTransport):
+    """Transport on a pooled requests session.
+
+    The urllib3 pool keeps up to pool_maxsize connections per host alive, so
+    concurrent workers reuse sockets instead of opening new ones.
+    """
+
+    def __init__(
+        self,
+        pool_connections: int = DEFAULT_POOL_CONNECTIONS,
+        pool_maxsize: int = DEFAULT_POOL_MAXSIZE,
+        keep_alive: bool = True,
+        session: requests.Session | None = None,
+    ) -> None:
+        """Init RequestsTransport.
+
+        Args:
+            pool_connections (int): number of hosts to keep pools for
+            pool_maxsize (int): max connections kept per host
+            keep_alive (bool): reuse connections between requests
+            session (requests.Session): optional session to share
+        """
+        self.session = session if session is not None else requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            pool_block=False,
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        if not keep_alive:
+            self.session.headers["Connection"] = "close"
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        params: dict[str, Any] | None = None,
+        data: bytes | None = None,
+        headers: dict[str, str] | None = None,
+        timeout: tuple[float, float] | None = None,
+    ) -> requests.Response:
+        """Send a request on the session."""
+        return self.session.request(
+            method, url, params=params, data=data, headers=headers, timeout=timeout
+        )
+
+    def close(self):
+        """Close the session and its pools."""
+        self.session.close()
+
+
+class HTTP2Transport(TuyaTransport):
+    """Transport on httpx with HTTP/2.
+
+    Concurrent requests are multiplexed as streams over one TLS connection to
+    the regional endpoint. Requires `pip install tuya-iot-py-sdk[http2]`.
+    """
+
+    def __init__(
+        self,
+        max_connections: int = DEFAULT_POOL_CONNECTIONS,
+        keepalive_expiry: float = DEFAULT_KEEPALIVE_EXPIRY,
+        client: httpx.Client | None = None,
+    ) -> None:
+        """Init HTTP2Transport.
+
+        Args:
+            max_connections (int): max connections, each carries many streams
+            keepalive_expiry (float): seconds an idle connection is kept
+            client (httpx.Client): optional client to share
+        """
+        if httpx is None:
+            raise ImportError(
+                "HTTP2Transport requires httpx, "
+                "install it with `pip install tuya-iot-py-sdk[http2]`"
+            )
+        self.client = (
+            client
+            if client is not None
+            else httpx.Client(
+                http2=True,
+                limits=httpx.Limits(
+                    max_connections=max_connections,
+                    max_keepalive_connections=max_connections,
+                    keepalive_expiry=keepalive_expiry,
+                ),
+            )
+        )
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        params: dict[str, Any] | None = None,
+        data: bytes | None = None,
+        headers: dict[str, str] | None = None,
+        timeout: tuple[float, float] | None = None,
+    ) -> TuyaResponse:
+        """Send a request on the http/2 client."""
+        if timeout is not None:
+            (connect_timeout, read_timeout) = timeout
+            timeout = httpx.Timeout(
+                read_timeout, connect=connect_timeout, pool=connect_timeout
+            )
+        try:
+            response = self.client.request(
+                method,
+                url,
+                params=params,
+                content=data,
+                headers=headers,
+                timeout=timeout,
+            )
+        except httpx.TimeoutException as e:
+            raise requests.exceptions.Timeout(str(e)) from e
+        except httpx.TransportError as e:
+            raise requests.exceptions.ConnectionError(str(e)) from e
+        return TuyaResponse(response.status_code, response.content)
+
+    def close(self):
+        """Close the client and its connections."""
+        self.client.close()